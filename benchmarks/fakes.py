@@ -0,0 +1,216 @@
+"""Lightweight stand-ins for the discord objects the hot paths touch.
+
+They only implement the attributes and coroutines BanHandler, Utils,
+ActionLogger and FirstrunReport actually use, and count the REST calls
+that would have been made instead of making them.
+"""
+import asyncio
+import datetime
+import random
+import string
+import time
+from typing import Dict, List, Optional
+
+
+class FakeUser:
+    def __init__(self, user_id: int):
+        self.id = user_id
+
+
+class FakeChannel:
+    def __init__(self, guild: "FakeGuild", channel_id: int = 1):
+        self.id = channel_id
+        self.guild = guild
+        self.sent = 0
+
+    async def send(self, *args, **kwargs):
+        self.sent += 1
+        return FakeMessage()
+
+
+class FakeMessage:
+    def __init__(self):
+        self.edits = 0
+
+    async def edit(self, **kwargs):
+        self.edits += 1
+
+
+class FakeMember:
+    def __init__(self, member_id: int, name: str, guild: "FakeGuild",
+                 nick: Optional[str] = None, global_name: Optional[str] = None):
+        self.id = member_id
+        self.name = name
+        self.nick = nick
+        self.global_name = global_name
+        self.guild = guild
+        self.mention = f"<@{member_id}>"
+        self.bans = 0
+        self.dms = 0
+
+    def __str__(self):
+        return self.name
+
+    async def ban(self, reason: str = None, **kwargs):
+        self.bans += 1
+        self.guild.bans += 1
+        self.guild.ban_requests += 1
+
+    async def send(self, content=None, **kwargs):
+        self.dms += 1
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int, members: Optional[List[FakeMember]] = None):
+        self.id = guild_id
+        self.members: List[FakeMember] = members or []
+        self.chunked = True
+        self.bans = 0
+        self.ban_requests = 0
+
+    @property
+    def member_count(self) -> int:
+        return len(self.members)
+
+    async def bulk_ban(self, users, *, reason: str = None, **kwargs) -> "FakeBulkBanResult":
+        self.ban_requests += 1
+        for user in users:
+            user.bans += 1
+        self.bans += len(users)
+        return FakeBulkBanResult([FakeUser(user.id) for user in users], [])
+
+    async def fetch_members(self, limit=None, after=None):
+        after_id = getattr(after, "id", 0) or 0
+        for member in sorted(self.members, key=lambda m: m.id):
+            if member.id > after_id:
+                yield member
+
+
+class FakeBulkBanResult:
+    def __init__(self, banned: List[FakeUser], failed: List[FakeUser]):
+        self.banned = banned
+        self.failed = failed
+
+
+class FakeFollowup:
+    def __init__(self):
+        self.sent = 0
+        self.titles: List[str] = []
+
+    async def send(self, *args, embed=None, embeds=None, **kwargs):
+        self.sent += 1
+        for e in ([embed] if embed is not None else []) + list(embeds or []):
+            self.titles.append(e.title or "")
+        return FakeMessage()
+
+
+class FakeResponse:
+    def __init__(self):
+        self.done = False
+
+    async def defer(self, **kwargs):
+        self.done = True
+
+    async def send_message(self, *args, **kwargs):
+        self.done = True
+
+    def is_done(self) -> bool:
+        return self.done
+
+
+class FakeInteraction:
+    def __init__(self, guild: FakeGuild, user_id: int = 1):
+        self.guild = guild
+        self.guild_id = guild.id
+        self.user = FakeUser(user_id)
+        self.response = FakeResponse()
+        self.followup = FakeFollowup()
+        self.channel = None
+        self.created_at = datetime.datetime.now(datetime.timezone.utc)
+
+
+class FakeBot:
+    """Carries the shared services a cog expects to find on the bot"""
+
+    def __init__(self, **services):
+        self.user = FakeUser(0)
+        self.channels: Dict[int, FakeChannel] = {}
+        for name, service in services.items():
+            setattr(self, name, service)
+
+    def get_channel(self, channel_id: int) -> Optional[FakeChannel]:
+        return self.channels.get(channel_id)
+
+
+class _FakeResponseHeaders:
+    def __init__(self, headers: Dict[str, str]):
+        self.headers = headers
+        self.status = 429
+
+
+class FakeRateLimited(Exception):
+    """Shaped like discord.HTTPException for a 429"""
+
+    def __init__(self, headers: Dict[str, str]):
+        super().__init__("429 Too Many Requests")
+        self.status = 429
+        self.response = _FakeResponseHeaders(headers)
+
+
+class FakeRest:
+    """Local REST stand-in enforcing a fixed-window bucket limit.
+
+    Calls over the limit raise FakeRateLimited carrying the same
+    X-RateLimit-* / Retry-After headers Discord sends.
+    """
+
+    def __init__(self, limit: int = 5, window: float = 1.0, latency: float = 0.005):
+        self.limit = limit
+        self.window = window
+        self.latency = latency
+        self.calls: List[float] = []
+        self.ok = 0
+        self.rate_limited = 0
+
+    async def request(self):
+        await asyncio.sleep(self.latency)
+        now = time.monotonic()
+        self.calls = [t for t in self.calls if t > now - self.window]
+        if len(self.calls) >= self.limit:
+            self.rate_limited += 1
+            reset_after = self.window - (now - self.calls[0])
+            raise FakeRateLimited({
+                "Retry-After": f"{reset_after:.3f}",
+                "X-RateLimit-Limit": str(self.limit),
+                "X-RateLimit-Remaining": "0",
+                "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+                "X-RateLimit-Bucket": "fake-bucket",
+                "X-RateLimit-Scope": "user",
+            })
+        self.calls.append(now)
+        self.ok += 1
+
+
+def random_name(rng: random.Random, length: int = 10) -> str:
+    return "".join(rng.choice(string.ascii_lowercase + string.digits + "_") for _ in range(length))
+
+
+def make_guild(guild_id: int, size: int, banned_ids: List[int], banned_fraction: float = 0.01,
+               keyword_fraction: float = 0.01, seed: int = 0) -> FakeGuild:
+    """A guild whose members are a mix of clean, banlisted and keyword-matching accounts"""
+    rng = random.Random(seed)
+    guild = FakeGuild(guild_id)
+    base = 1_000_000_000_000_000_000
+    for i in range(size):
+        roll = rng.random()
+        if roll < banned_fraction and banned_ids:
+            member_id = rng.choice(banned_ids)
+            name = random_name(rng)
+        elif roll < banned_fraction + keyword_fraction:
+            member_id = base + i
+            name = random_name(rng, 4) + "spawn" + random_name(rng, 3)
+        else:
+            member_id = base + i
+            name = random_name(rng)
+        guild.members.append(FakeMember(member_id, name, guild, global_name=random_name(rng, 8)))
+    return guild
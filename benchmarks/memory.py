@@ -0,0 +1,196 @@
+"""Memory used by discord.py's caches under the default and LOW_MEMORY profiles.
+
+Run from the repository root (needs discord.py installed):
+
+    python3 -m benchmarks.memory
+    python3 -m benchmarks.memory --guilds 5 --members 100000 --joins 2000
+
+Each profile gets its own client state, which is then fed the gateway
+traffic Discord would send it with that profile's intents:
+
+- a GUILD_CREATE per guild; large guilds only carry a few members
+- the full member list through member chunks, if the profile chunks at startup
+- PRESENCE_UPDATE and MESSAGE_CREATE events, if their intents are enabled
+- GUILD_MEMBER_ADD for the joins seen while running
+
+The report is the memory tracemalloc attributes to the client state for
+each profile, as JSON.
+"""
+import argparse
+import gc
+import json
+import platform
+import random
+import sys
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Dict
+
+import discord
+
+from benchmarks.fakes import random_name
+from utils.client_profile import client_options
+
+# Discord only sends this many members in GUILD_CREATE for large guilds
+LARGE_THRESHOLD = 250
+BASE_ID = 1_000_000_000_000_000_000
+
+
+def user_payload(rng: random.Random, user_id: int) -> dict:
+    return {
+        "id": str(user_id),
+        "username": random_name(rng, 12),
+        "global_name": random_name(rng, 10),
+        "discriminator": "0",
+        "avatar": None,
+    }
+
+
+def member_payload(rng: random.Random, user_id: int) -> dict:
+    return {
+        "user": user_payload(rng, user_id),
+        "nick": random_name(rng, 8) if rng.random() < 0.3 else None,
+        "roles": [],
+        "joined_at": datetime.now(timezone.utc).isoformat(),
+        "deaf": False,
+        "mute": False,
+        "flags": 0,
+    }
+
+
+def guild_payload(guild_id: int, members: list, member_count: int) -> dict:
+    return {
+        "id": str(guild_id),
+        "name": f"guild {guild_id}",
+        "owner_id": str(BASE_ID),
+        "roles": [{
+            "id": str(guild_id), "name": "@everyone", "permissions": "0", "position": 0,
+            "color": 0, "hoist": False, "managed": False, "mentionable": False,
+        }],
+        "emojis": [],
+        "stickers": [],
+        "features": [],
+        "channels": [{
+            "id": str(guild_id + 1), "type": 0, "name": "general",
+            "position": 0, "permission_overwrites": [],
+        }],
+        "members": members,
+        "presences": [],
+        "member_count": member_count,
+        "large": member_count > LARGE_THRESHOLD,
+    }
+
+
+def presence_payload(guild_id: int, user_id: int) -> dict:
+    return {
+        "user": {"id": str(user_id)},
+        "guild_id": str(guild_id),
+        "status": "online",
+        "activities": [{"name": "a game", "type": 0}],
+        "client_status": {"desktop": "online"},
+    }
+
+
+def message_payload(rng: random.Random, guild_id: int, message_id: int, member: dict) -> dict:
+    return {
+        "id": str(message_id),
+        "channel_id": str(guild_id + 1),
+        "guild_id": str(guild_id),
+        "author": member["user"],
+        "member": {k: v for k, v in member.items() if k != "user"},
+        "content": random_name(rng, 40),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "type": 0,
+    }
+
+
+def measure_profile(low_memory: bool, guilds: int, members: int, joins: int, messages: int) -> Dict:
+    options = client_options(low_memory)
+    intents = options["intents"]
+    rng = random.Random(0)
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.take_snapshot()
+
+    client = discord.Client(**options)
+    state = client._connection
+    state.dispatch = lambda *args, **kwargs: None  # Nothing is listening
+    next_id = BASE_ID
+    for g in range(guilds):
+        guild_id = BASE_ID // 2 + g * 1_000_000
+        roster = []
+        for _ in range(members):
+            next_id += 1
+            roster.append(member_payload(rng, next_id))
+        # GUILD_CREATE only lists a few members of a large guild
+        guild = discord.Guild(data=guild_payload(guild_id, roster[:LARGE_THRESHOLD], members), state=state)
+        state._add_guild(guild)
+        if options.get("chunk_guilds_at_startup", True):
+            # What the member chunks requested at startup end up caching
+            for mdata in roster[LARGE_THRESHOLD:]:
+                guild._add_member(discord.Member(data=mdata, guild=guild, state=state))
+        if intents.presences:
+            for mdata in roster[::4]:
+                state.parse_presence_update(presence_payload(guild_id, int(mdata["user"]["id"])))
+        if intents.guild_messages:
+            for i in range(messages):
+                state.parse_message_create(message_payload(rng, guild_id, next_id + i, rng.choice(roster)))
+        for _ in range(joins):
+            next_id += 1
+            data = member_payload(rng, next_id)
+            data["guild_id"] = str(guild_id)
+            state.parse_guild_member_add(data)
+        del roster  # Only what the client kept should be counted
+
+    gc.collect()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    used = sum(stat.size_diff for stat in snapshot.compare_to(baseline, "filename"))
+    cached = sum(len(g.members) for g in client.guilds)
+    result = {
+        "profile": "low_memory" if low_memory else "default",
+        "guilds": guilds,
+        "members_per_guild": members,
+        "cached_members": cached,
+        "cached_messages": len(state._messages or ()),
+        "bytes": used,
+        "mib": round(used / 2 ** 20, 1),
+    }
+    del client, state
+    gc.collect()
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare discord.py cache memory under both client profiles")
+    parser.add_argument("--guilds", type=int, default=3)
+    parser.add_argument("--members", type=int, default=50_000, help="Members per guild")
+    parser.add_argument("--joins", type=int, default=1_000, help="Joins seen per guild after startup")
+    parser.add_argument("--messages", type=int, default=1_000, help="Messages seen per guild")
+    args = parser.parse_args()
+
+    results = [measure_profile(low, args.guilds, args.members, args.joins, args.messages) for low in (False, True)]
+    default, low = results
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "discord.py": discord.__version__,
+        },
+        "results": results,
+        "low_memory_ratio": round(low["bytes"] / default["bytes"], 3) if default["bytes"] else None,
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,378 @@
+"""Microbenchmarks for the detection and persistence hot paths.
+
+Run from the repository root:
+
+    python3 -m benchmarks.run                        # default sizes, JSON to stdout
+    python3 -m benchmarks.run --sizes 1000,10000000  # banlist sizes to test
+    python3 -m benchmarks.run --only keywords,banlist --output after.json
+    python3 -m benchmarks.run --compare before.json  # print ratios against a previous run
+
+Every result has ops, seconds, ops_per_sec and us_per_op (plus the REST
+calls a benchmark would have made under "counts"). Benchmarks that
+need discord.py report the import error instead of a result when it is
+not installed.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from array import array
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from benchmarks.fakes import (FakeBot, FakeChannel, FakeInteraction, FakeRest,
+                              make_guild, random_name)
+from utils import compiled_banlist
+from utils.banlist import BanlistIndex
+
+SNOWFLAKE_BASE = 1_100_000_000_000_000_000
+
+
+def write_synthetic_banlist(directory: Path, size: int, seed: int = 0) -> Path:
+    """Write a compiled banlist of ``size`` increasing snowflakes without building it in Python objects"""
+    rng = random.Random(seed)
+    path = directory / f"banlist_{size}.bin"
+    ids = array("Q")
+    current = SNOWFLAKE_BASE
+    for _ in range(size):
+        current += rng.randint(1, 1 << 20)
+        ids.append(current)
+    if sys.byteorder != "little":
+        ids.byteswap()
+    header = compiled_banlist.HEADER.pack(
+        compiled_banlist.MAGIC, compiled_banlist.FORMAT_VERSION, 0, size,
+        compiled_banlist.HEADER.size + size * 8, 0
+    )
+    with open(path, "wb") as f:
+        f.write(header)
+        f.write(ids.tobytes())
+    # An empty CSV older than the .bin, so BanlistIndex maps the .bin as-is
+    csv_path = directory / f"banlist_{size}.csv"
+    csv_path.write_text("id,username\n")
+    os.utime(csv_path, (0, 0))
+    return csv_path
+
+
+def measure(name: str, ops: int, fn: Callable[[], None], **params) -> Dict:
+    started = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - started
+    return {
+        "name": name,
+        "params": params,
+        "ops": ops,
+        "seconds": round(seconds, 6),
+        "ops_per_sec": round(ops / seconds, 1) if seconds else None,
+        "us_per_op": round(seconds / ops * 1e6, 3) if ops else None,
+    }
+
+
+async def measure_async(name: str, ops: int, coro_fn, **params) -> Dict:
+    started = time.perf_counter()
+    await coro_fn()
+    seconds = time.perf_counter() - started
+    return {
+        "name": name,
+        "params": params,
+        "ops": ops,
+        "seconds": round(seconds, 6),
+        "ops_per_sec": round(ops / seconds, 1) if seconds else None,
+        "us_per_op": round(seconds / ops * 1e6, 3) if ops else None,
+    }
+
+
+def bench_banlist(workdir: Path, sizes: List[int], lookups: int) -> List[Dict]:
+    results = []
+    for size in sizes:
+        csv_path = write_synthetic_banlist(workdir, size)
+        started = time.perf_counter()
+        index = BanlistIndex(str(csv_path))
+        load_seconds = time.perf_counter() - started
+        results.append({
+            "name": "banlist.load", "params": {"size": size}, "ops": 1,
+            "seconds": round(load_seconds, 6), "ops_per_sec": None, "us_per_op": round(load_seconds * 1e6, 3),
+        })
+        members = list(index.snapshot.ids[::max(1, size // lookups)][:lookups // 2]) if size else []
+        misses = [SNOWFLAKE_BASE - 1 - i for i in range(lookups - len(members))]
+        probes = members + misses
+        random.Random(1).shuffle(probes)
+
+        def lookups_fn():
+            for user_id in probes:
+                index.contains(user_id)
+
+        results.append(measure("banlist.contains", len(probes), lookups_fn, size=size))
+        results.append(measure("banlist.contains_many", len(probes), lambda: index.contains_many(probes), size=size))
+    return results
+
+
+def bench_keywords(counts: List[int], members: int) -> List[Dict]:
+    """The Utils entry points the bot calls, so per-call overhead shows up with the matching"""
+    from utils.utils import Utils
+    rng = random.Random(2)
+    fields = [
+        {"name": random_name(rng, 12), "nick": random_name(rng, 8) if i % 3 else None,
+         "global_name": random_name(rng, 10) + ("spawn" if i % 50 == 0 else "")}
+        for i in range(members)
+    ]
+    texts = [f["name"] for f in fields]
+    original = list(Utils.BANNED_KEYWORDS)
+    results = []
+    try:
+        for count in counts:
+            keywords = original[:count] + [random_name(rng, 7) for _ in range(max(0, count - len(original)))]
+            Utils.set_banned_keywords(keywords)
+
+            def find():
+                for f in fields:
+                    Utils.find_banned_keywords(Utils, f)
+
+            def contains():
+                for text in texts:
+                    Utils.contains_banned_keyword(Utils, text)
+
+            results.append(measure("utils.find_banned_keywords", members, find, keywords=len(keywords)))
+            results.append(measure("utils.contains_banned_keyword", members, contains, keywords=len(keywords)))
+    finally:
+        Utils.set_banned_keywords(original)
+    return results
+
+
+def _make_ban_handler(workdir: Path, index: BanlistIndex):
+    from cogs.ban_handler import BanHandler
+    from utils.action_logger import ActionLogger
+    from utils.ban_executor import BanExecutor
+    from utils.config import ConfigManager
+    from utils.counters import BanCounters
+    from utils.decision_cache import DecisionCache
+    from utils.dm_queue import DMQueue
+    from utils.join_queue import JoinQueue
+    from utils.ledger import BanLedger
+    from utils.outbox import ChannelOutbox
+    from utils.services import Services
+    from utils.settings import SettingsStore
+
+    settings = SettingsStore(workdir)
+    outbox = ChannelOutbox()
+    logger = ActionLogger(outbox=outbox, root_dir=workdir / "logs")
+    bot = FakeBot(services=Services(
+        settings=settings,
+        config=ConfigManager(settings),
+        banlist=index,
+        executor=BanExecutor(concurrency=50, route_rate=1e9, global_rate=1e9),
+        join_queue=JoinQueue(maxsize=1_000_000, spill_path=str(workdir / "join_spill.jsonl")),
+        decisions=DecisionCache(),
+        logger=logger,
+        ledger=BanLedger(workdir / "ledger.db"),
+        counters=BanCounters(workdir),
+        outbox=outbox,
+        dm_queue=DMQueue(),
+    ))
+    return bot, BanHandler(bot)
+
+
+async def bench_join_path(workdir: Path, size: int, joins: int) -> List[Dict]:
+    csv_path = write_synthetic_banlist(workdir, size)
+    index = BanlistIndex(str(csv_path))
+    bot, handler = _make_ban_handler(workdir, index)
+    banned_ids = list(index.snapshot.ids[:1000])
+    guild = make_guild(42, joins, banned_ids, seed=4)
+    channel = FakeChannel(guild, 7)
+    bot.channels[channel.id] = channel
+    bot.services.settings.set_channel(guild.id, channel.id)
+
+    probes = banned_ids + [SNOWFLAKE_BASE - 1 - i for i in range(len(banned_ids))]
+    random.Random(3).shuffle(probes)
+
+    async def check_ids():
+        for user_id in probes:
+            await handler.check_id_ban(user_id)
+
+    results = [await measure_async("ban_handler.check_id_ban", len(probes), check_ids, banlist_size=size)]
+
+    await handler.cog_load()
+
+    async def run():
+        for member in guild.members:
+            await handler.on_member_join(member)
+        await bot.services.join_queue.join()
+
+    result = await measure_async("ban_handler.on_member_join", joins, run, banlist_size=size)
+    await handler.cog_unload()
+    result["counts"] = {"bans": guild.bans, "ban_requests": guild.ban_requests}
+    # Log messages are still queued on the outbox until close() sends them
+    await bot.services.close()
+    result["counts"]["channel_messages"] = channel.sent
+    results.append(result)
+    return results
+
+
+async def bench_firstrun(workdir: Path, size: int, guild_size: int) -> List[Dict]:
+    csv_path = write_synthetic_banlist(workdir, size)
+    index = BanlistIndex(str(csv_path))
+    bot, handler = _make_ban_handler(workdir, index)
+    banned_ids = list(index.snapshot.ids[:1000])
+    guild = make_guild(43, guild_size, banned_ids, seed=5)
+    interaction = FakeInteraction(guild)
+    # ban_firstrun is an app command; call the wrapped coroutine directly
+    command = type(handler).ban_firstrun
+    callback = getattr(command, "callback", command)
+
+    from utils.keywords import member_fields
+    from utils.utils import Utils
+    expected = sum(
+        1 for member in guild.members
+        if index.contains(member.id) or Utils.find_banned_keywords(Utils, member_fields(member))
+    )
+
+    result = await measure_async(
+        "ban_handler.ban_firstrun", guild_size, lambda: callback(handler, interaction),
+        banlist_size=size
+    )
+    await bot.services.close()
+    # A scan that errored out is fast too; don't report its timing as the scan's
+    errors = [title for title in interaction.followup.titles if title.startswith("❌")]
+    if errors:
+        raise RuntimeError(f"ban_firstrun failed: {', '.join(errors)}")
+    if not expected or guild.bans != expected:
+        raise RuntimeError(f"ban_firstrun banned {guild.bans} members, expected {expected}")
+    result["counts"] = {"bans": guild.bans, "ban_requests": guild.ban_requests}
+    result["counts"]["followups"] = interaction.followup.sent
+    return [result]
+
+
+async def bench_cross_guild(workdir: Path, size: int, members: int) -> List[Dict]:
+    """The same accounts screened in a second guild, which should come from the decision cache"""
+    csv_path = write_synthetic_banlist(workdir, size)
+    index = BanlistIndex(str(csv_path))
+    bot, handler = _make_ban_handler(workdir, index)
+    first = make_guild(44, members, list(index.snapshot.ids[:1000]), seed=6)
+    snapshot = index.snapshot
+    results = [measure("ban_handler.find_matches.cold", members,
+                       lambda: handler._find_matches(first.members, snapshot), banlist_size=size)]
+    results.append(measure("ban_handler.find_matches.cached", members,
+                           lambda: handler._find_matches(first.members, snapshot), banlist_size=size))
+    results[-1]["counts"] = bot.services.decisions.stats()
+    await bot.services.close()
+    return results
+
+
+def bench_action_logger(workdir: Path, entries: int) -> List[Dict]:
+    from utils.action_logger import ActionLogger
+    logger = ActionLogger(root_dir=workdir / "logs")
+
+    def run():
+        for i in range(entries):
+            logger.log_action(str(i % 20), "Member Banned", f"Banned user {i}", str(i))
+
+    result = measure("action_logger.log_action", entries, run)
+    logger.close()
+    return [result]
+
+
+async def bench_executor(requests: int) -> List[Dict]:
+    from utils.ban_executor import BanExecutor
+    rest = FakeRest(limit=50, window=1.0, latency=0.002)
+    executor = BanExecutor(concurrency=10, route_rate=100.0)
+
+    async def run():
+        await asyncio.gather(*[executor.submit("ban:1", rest.request) for _ in range(requests)])
+
+    result = await measure_async("ban_executor.submit", requests, run)
+    result["counts"] = {"rate_limited": rest.rate_limited}
+    return [result]
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(current: Dict, baseline: Dict) -> List[str]:
+    """Human-readable ratios between two runs (>1 means slower now)"""
+    def key(r):
+        return r["name"], json.dumps(r.get("params", {}), sort_keys=True)
+    before = {key(r): r for r in baseline.get("results", []) if "seconds" in r}
+    lines = []
+    for r in current["results"]:
+        old = before.get(key(r))
+        if old and "seconds" in r and old["seconds"] and old["ops"] == r["ops"]:
+            lines.append(f"{r['name']} {r['params']}: {r['seconds'] / old['seconds']:.2f}x time")
+    return lines
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Despawner microbenchmarks")
+    parser.add_argument("--sizes", default="1000,100000,1000000",
+                        help="Comma-separated synthetic banlist sizes (up to 10000000)")
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument("--members", type=int, default=20_000, help="Members per keyword benchmark")
+    parser.add_argument("--keyword-counts", default="6,100,1000,5000")
+    parser.add_argument("--joins", type=int, default=5_000)
+    parser.add_argument("--guild-size", type=int, default=50_000)
+    parser.add_argument("--log-entries", type=int, default=50_000)
+    parser.add_argument("--only", help="Comma-separated subset: banlist,keywords,join,firstrun,decisions,logger,executor")
+    parser.add_argument("--output", help="Write JSON here instead of stdout")
+    parser.add_argument("--compare", help="Previous JSON output to compare against")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    only = set(args.only.split(",")) if args.only else None
+    results: List[Dict] = []
+
+    def run(group: str, fn):
+        if only and group not in only:
+            return
+        try:
+            out = fn()
+            if asyncio.iscoroutine(out):
+                out = asyncio.run(out)
+            results.extend(out)
+        except ImportError as e:
+            results.append({"name": group, "skipped": f"missing dependency: {e}"})
+
+    # The services print status lines; keep stdout for the JSON report
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(sys.stderr):
+        workdir = Path(tmp)
+        run("banlist", lambda: bench_banlist(workdir, sizes, args.lookups))
+        run("keywords", lambda: bench_keywords([int(c) for c in args.keyword_counts.split(",")], args.members))
+        run("join", lambda: bench_join_path(workdir, max(sizes), args.joins))
+        run("firstrun", lambda: bench_firstrun(workdir, max(sizes), args.guild_size))
+        run("decisions", lambda: bench_cross_guild(workdir, max(sizes), args.members))
+        run("logger", lambda: bench_action_logger(workdir, args.log_entries))
+        run("executor", lambda: bench_executor(200))
+
+    report = {
+        "meta": {
+            "timestamp": time.time(),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(payload)
+    else:
+        print(payload)
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        for line in compare(report, baseline):
+            print(line, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
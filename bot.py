@@ -1,52 +1,112 @@
+import asyncio
 import discord
 from discord.ext import commands
 import os
 import logging
+import signal
+import time
 from dotenv import load_dotenv
 import csv
 import json
 from datetime import datetime
 from utils.utils import Utils
+from utils.services import Services
+from utils.client_profile import client_options
+from utils.sharding import owns_global_commands, shard_options
+from utils.startup import CommandSyncState, StartupTimer, command_fingerprint
+from utils import metrics
 from pathlib import Path
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
 bot_token = os.getenv('DISCORD_BOT_TOKEN')
 
-class Bot(commands.Bot):
+class Bot(commands.AutoShardedBot):
     def __init__(self):
+        self.startup = StartupTimer()
+        # LOW_MEMORY=1 trades the full member/presence/message caches for minimal intents
+        self.low_memory = os.getenv('LOW_MEMORY') == '1'
+        # SHARD_COUNT/SHARD_IDS split the shards between processes; see start.sh
         super().__init__(
             command_prefix="$",
-            intents=discord.Intents.all(),
-            application_id=os.getenv('APPLICATION_ID')
+            application_id=os.getenv('APPLICATION_ID'),
+            **client_options(self.low_memory),
+            **shard_options()
         )
+        # Shared by every cog; see Services
+        with self.startup.phase("services"):
+            self.services = Services.from_env()
+        # Created in setup_hook, once the application ID is known
+        self.command_sync = None
     
     async def setup_hook(self):
+        if self.services.metrics_server:
+            metrics.BANLIST_SIZE.set_function(lambda: len(self.services.banlist))
+            metrics.BANLIST_VERSION.set_function(lambda: self.services.banlist.version)
+            metrics.GUILDS.set_function(lambda: len(self.guilds))
+            metrics.CACHED_MEMBERS.set_function(lambda: sum(len(g.members) for g in self.guilds))
+        await self.services.start()
+        # stop.sh sends SIGTERM; shut down cleanly so pending settings get flushed
+        try:
+            self.loop.add_signal_handler(signal.SIGTERM, lambda: asyncio.create_task(self.close()))
+        except NotImplementedError:
+            pass  # Windows event loops don't support signal handlers
+
         # Load all cogs
-        cogs_dir = Path(__file__).parent / "cogs"
-        if cogs_dir.exists():
-            for cog_file in cogs_dir.glob("*.py"):
-                if cog_file.name != "__init__.py":
-                    try:
-                        await self.load_extension(f"cogs.{cog_file.stem}")
-                        print(f"Loaded cog: {cog_file.stem}")
-                    except Exception as e:
-                        print(f"Failed to load cog {cog_file.stem}: {str(e)}")
-
-        # Sync commands
+        with self.startup.phase("cogs"):
+            cogs_dir = Path(__file__).parent / "cogs"
+            if cogs_dir.exists():
+                for cog_file in cogs_dir.glob("*.py"):
+                    if cog_file.name != "__init__.py":
+                        try:
+                            await self.load_extension(f"cogs.{cog_file.stem}")
+                            print(f"Loaded cog: {cog_file.stem}")
+                        except Exception as e:
+                            print(f"Failed to load cog {cog_file.stem}: {str(e)}")
+
+        # Sync commands, but only if they changed since the last sync
+        with self.startup.phase("command sync"):
+            self.command_sync = CommandSyncState(self.application_id)
+            await self.sync_commands(force=os.getenv('FORCE_COMMAND_SYNC') == '1')
+        self._connect_started = time.perf_counter()
+
+    async def sync_commands(self, force: bool = False) -> bool:
+        """Sync the global command tree if its fingerprint changed. Returns whether it synced."""
+        if not owns_global_commands():
+            # The process running shard 0 syncs the global tree for everyone
+            return False
+        fingerprint = command_fingerprint(self.tree)
+        if not force and fingerprint == self.command_sync.global_fingerprint:
+            print("Command tree unchanged, skipping sync")
+            return False
         await self.tree.sync()
+        self.command_sync.global_fingerprint = fingerprint
+        await self.command_sync.save_async()
         print("Command tree synced!")
+        return True
 
-bot = Bot()
-
-# Update the initial loading
-spawnists = Utils.read_csv_as_list_of_dicts(Utils, "thelist.csv")
-target_channels = Utils.load_channels(Utils)
-# Remove global appeal_link as it's now per-guild
+    async def sync_guild_commands(self, guild: discord.Guild, save: bool = True) -> bool:
+        """Sync a guild's commands unless that exact tree was already synced there.
 
+        Pass ``save=False`` when syncing many guilds, and save once afterwards.
+        """
+        fingerprint = command_fingerprint(self.tree, guild=guild)
+        if self.command_sync.guild_synced(guild.id, fingerprint):
+            return False
+        await self.tree.sync(guild=guild)
+        self.command_sync.guilds[str(guild.id)] = fingerprint
+        if save:
+            await self.command_sync.save_async()
+        return True
 
+    async def on_guild_join(self, guild: discord.Guild):
+        await self.sync_guild_commands(guild)
 
+    async def close(self):
+        await self.services.close()
+        await super().close()
 
+bot = Bot()
 
 
 
@@ -54,18 +114,19 @@ target_channels = Utils.load_channels(Utils)
 @commands.has_permissions(ban_members=True)
 async def outchannel(interaction: discord.Interaction, channel: discord.TextChannel):
     guild_id = str(interaction.guild_id)
-    global target_channels
-    target_channels[guild_id] = channel.id
-    Utils.save_channels(Utils, target_channels)
+    bot.services.settings.set_channel(guild_id, channel.id)
     await interaction.response.send_message(f"Successfully set channel to {channel.mention}", ephemeral=True)
 
 @bot.tree.command(name="reloadlists", description="Reloads the banlist and keywords from disk.")
 @commands.has_permissions(ban_members=True)
 async def reloadlists(interaction: discord.Interaction):
-    global spawnists, target_channels
-    spawnists = Utils.read_csv_as_list_of_dicts(Utils, "thelist.csv")
-    target_channels = Utils.load_channels(Utils)
-    await interaction.response.send_message("Banlist and channels reloaded from disk.", ephemeral=True)
+    snapshot = await bot.services.banlist.reload_async()
+    await bot.services.settings.reload()
+    await interaction.response.send_message(
+        f"Banlist and channels reloaded from disk.\n"
+        f"Entries: {len(snapshot)} (loaded in {snapshot.load_time * 1000:.1f}ms)",
+        ephemeral=True
+    )
 
 # Error handler for permission errors
 
@@ -80,13 +141,29 @@ async def permission_error(ctx, error):
 
 @bot.event
 async def on_ready():
-    # Sync commands globally and per guild for instant updates
-    await bot.tree.sync()
-    for guild in bot.guilds:
-        await bot.tree.sync(guild=guild)
-    print(f"Logged in as {bot.user} (ID: {bot.user.id})")
-    print("Command tree synced.")
+    print(f"Logged in as {bot.user} (ID: {bot.user.id}), shards {sorted(bot.shards)} of {bot.shard_count}")
+    # on_ready also fires after gateway reconnects; only the first one is startup
+    if bot.startup.reported:
+        return
+    bot.startup.mark("connect", bot._connect_started)
+    with bot.startup.phase("guild sync"):
+        # Only guilds joined while offline (or whose commands changed) need a sync
+        synced = 0
+        for guild in bot.guilds:
+            if await bot.sync_guild_commands(guild, save=False):
+                synced += 1
+        # One write for every guild synced, rather than one per guild
+        if synced:
+            await bot.command_sync.save_async()
+    if synced:
+        print(f"Synced commands to {synced} guilds")
+    bot.startup.reported = True
+    print(bot.startup.report())
 
 if __name__ == "__main__":
-    bot.run(bot_token)
+    try:
+        bot.run(bot_token)
+    finally:
+        # Catch anything written after close() started
+        bot.services.flush_sync()
 
@@ -1,102 +1,181 @@
+import asyncio
+import time
+from typing import Dict, Set
 import discord
 from discord import app_commands
 from discord.ext import commands
 from utils.utils import Utils
-from utils.config import ConfigManager
 from utils.error_handler import ErrorHandler
-from utils.action_logger import ActionLogger
+from utils.keywords import member_fields
+from utils.decision_cache import CLEAN, fields_key
+from utils.firstrun_report import FirstrunReport
+from utils.checkpoint import ScanCheckpoint
+from utils.ban_executor import RateLimitedError
+
+# Members scanned per batch, and per checkpoint in stream mode
+STREAM_CHUNK_SIZE = 1000
+
+# Outcomes counted under their own trigger rather than "id"/"keyword"
+COUNTER_TRIGGERS = {"notified": "notify", "failed": "failure"}
+
+# Most users Discord accepts in one bulk ban request
+BULK_BAN_LIMIT = 200
+
+# Seconds to wait for further profile edits before re-screening a user
+RESCREEN_DELAY = 5.0
 
 class BanHandler(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.config_manager = ConfigManager()
-        self.logger = ActionLogger()
-        self.reload_banned_ids()
+        services = bot.services
+        self.settings = services.settings
+        self.config_manager = services.config
+        self.logger = services.logger
+        self.banlist = services.banlist
+        self.executor = services.executor
+        self.ledger = services.ledger
+        self.counters = services.counters
+        self.join_queue = services.join_queue
+        self.decisions = services.decisions
+        self.outbox = services.outbox
+        self.dm_queue = services.dm_queue
+        # user ID -> {guild ID: changed fields} waiting to be re-screened, and its timer
+        self._rescreen_pending: Dict[int, Dict[int, Set[str]]] = {}
+        self._rescreen_timers: Dict[int, asyncio.TimerHandle] = {}
+        # Running re-screens; asyncio only keeps weak references to tasks
+        self._rescreen_tasks: Set[asyncio.Task] = set()
 
-    def reload_banned_ids(self):
-        """Reload the banned IDs set from CSV"""
-        self.banned_ids = set()
-        try:
-            with open("thelist.csv", 'r') as f:
-                for line in f:
-                    # Strip whitespace and get first column if comma-separated
-                    user_id = line.strip().split(',')[0]
-                    if user_id and user_id.isdigit():
-                        self.banned_ids.add(str(user_id))
-            print(f"Loaded {len(self.banned_ids)} banned IDs")
-        except Exception as e:
-            print(f"Error loading banned IDs: {e}")
+    async def cog_load(self):
+        self.join_queue.start(self._process_joins, resolve=self._resolve_member)
+
+    async def cog_unload(self):
+        for timer in self._rescreen_timers.values():
+            timer.cancel()
+        self._rescreen_timers.clear()
+        self._rescreen_pending.clear()
+        for task in self._rescreen_tasks:
+            task.cancel()
+        await asyncio.gather(*self._rescreen_tasks, return_exceptions=True)
+        await self.join_queue.stop()
 
     async def check_id_ban(self, member_id: str) -> bool:
         """Check if a member ID is in the banned list"""
-        return str(member_id).strip() in self.banned_ids
+        return self.banlist.contains(str(member_id).strip())
 
     ban_group = app_commands.Group(name="ban", description="Ban related commands")
 
+    def _find_matches(self, members, banlist):
+        """Scan members against the banlist and keywords. Returns (member, trigger, keyword) tuples."""
+        members = [member for member in members if member.id != self.bot.user.id]
+        self.decisions.validate((banlist.generation, Utils.keywords_version))
+        verdicts = {}
+        misses = []
+        for member in members:
+            fields = member_fields(member)
+            key = fields_key(fields)
+            verdict = self.decisions.get(member.id, key)
+            if verdict is None:
+                misses.append((member, fields, key))
+            else:
+                verdicts[member.id] = verdict
+
+        # One sorted lookup for the whole batch instead of a search per member
+        listed = set(banlist.contains_many(member.id for member, _, _ in misses))
+        for member, fields, key in misses:
+            if member.id in listed:
+                verdict = ("id", None)
+            else:
+                hit = Utils.keyword_matcher().best(Utils.find_banned_keywords(Utils, fields))
+                verdict = ("keyword", hit.keyword) if hit else CLEAN
+            self.decisions.put(member.id, key, verdict)
+            verdicts[member.id] = verdict
+
+        return [(member, *verdicts[member.id]) for member in members if verdicts[member.id] != CLEAN]
+
+    async def _ban_matches(self, guild: discord.Guild, matches, report: FirstrunReport) -> None:
+        """Ban every match, one bulk ban request at a time, and record the outcomes"""
+        for start in range(0, len(matches), BULK_BAN_LIMIT):
+            outcomes = await self.ban_many_with_appeal(guild, matches[start:start + BULK_BAN_LIMIT])
+            for member, trigger, keyword, status in outcomes:
+                report.record(member, trigger, status, keyword)
+            await report.update()
+
+    async def _firstrun_cached(self, guild: discord.Guild, report: FirstrunReport, banlist) -> None:
+        """Scan the cached member list"""
+        members = list(guild.members)
+        matches = []
+        for start in range(0, len(members), STREAM_CHUNK_SIZE):
+            chunk = members[start:start + STREAM_CHUNK_SIZE]
+            matches.extend(self._find_matches(chunk, banlist))
+            report.checked += len(chunk)
+            report.matched = len(matches)
+            # Yield so the gateway keeps flowing during large scans
+            await asyncio.sleep(0)
+            await report.update()
+        report.ban_phase_started = time.monotonic()
+        await self._ban_matches(guild, matches, report)
+
+    async def _firstrun_streamed(self, guild: discord.Guild, report: FirstrunReport, banlist,
+                                 checkpoint: ScanCheckpoint) -> None:
+        """Fetch members from the API in ID order, one chunk at a time, checkpointing as it goes"""
+        after = discord.Object(id=checkpoint.last_member_id) if checkpoint.resumed else None
+        chunk = []
+
+        async def process(chunk):
+            matches = self._find_matches(chunk, banlist)
+            report.checked += len(chunk)
+            report.matched += len(matches)
+            await self._ban_matches(guild, matches, report)
+            # Only advance once this chunk's bans are done, so a crash never skips a match
+            checkpoint.last_member_id = chunk[-1].id
+            checkpoint.checked, checkpoint.matched = report.checked, report.matched
+            checkpoint.banned, checkpoint.failed = report.banned, report.failed
+            await asyncio.to_thread(checkpoint.save)
+            await report.update()
+
+        async for member in guild.fetch_members(limit=None, after=after):
+            chunk.append(member)
+            if len(chunk) >= STREAM_CHUNK_SIZE:
+                await process(chunk)
+                chunk = []
+        if chunk:
+            await process(chunk)
+
     @ban_group.command(name="firstrun", description="Scan and ban all matching users")
+    @app_commands.describe(
+        stream="Fetch members from the API instead of the member cache (automatic if the cache is incomplete)",
+        restart="Ignore any saved checkpoint and start the streamed scan from the beginning"
+    )
     @app_commands.checks.has_permissions(ban_members=True)
-    async def ban_firstrun(self, interaction: discord.Interaction):
+    async def ban_firstrun(self, interaction: discord.Interaction, stream: bool = False, restart: bool = False):
         try:
             await interaction.response.defer(ephemeral=True)
             guild = interaction.guild
             guild_id = str(guild.id)
-            checked_users = len(guild.members)
-            id_list = [str(row.get('id', '')).strip() for row in Utils.read_csv_as_list_of_dicts(Utils, "thelist.csv")]
-            matches = []
-            banned_count = 0
-            keyword_matches = []
-
-            for member in guild.members:
-                if member.id == self.bot.user.id:
-                    continue
-                banned = False
-                if str(member.id) in id_list:
-                    matches.append(member)
-                    await self.utils.ban_with_appeal(member, f"Despawner banned {member.id}", guild_id=guild_id)
-                    await interaction.followup.send(f'{member.mention} has been banned from the server.')
-                    banned_count += 1
-                    banned = True
-
-                if not banned:
-                    username = str(member.name)
-                    nickname = str(member.nick) if member.nick else ""
-                    bio = str(member.global_name) if member.global_name else ""
-                    for field in [username, nickname, bio]:
-                        keyword = Utils.contains_banned_keyword(Utils, field)
-                        if keyword:
-                            keyword_matches.append(member)
-                            await self.utils.ban_with_appeal(member, 
-                                f"Banned for forbidden keyword in username/nickname/bio.", 
-                                keyword=keyword, 
-                                guild_id=guild_id
-                            )
-                            await interaction.followup.send(
-                                f'{member.mention} has been banned for forbidden keyword "{keyword}"'
-                            )
-                            banned_count += 1
-                            break
-
-            # Create embed with results
-            embed = discord.Embed(
-                title="Firstrun Summary",
-                description="Ban operation summary",
-                color=discord.Color.red()
-            )
-            embed.add_field(name="Users Checked", value=str(checked_users), inline=False)
-            embed.add_field(name="IDs in List", value=str(len(id_list)), inline=False)
-            embed.add_field(name="Matches Found (ID)", value=str(len(matches)), inline=False)
-            embed.add_field(
-                name="Matched Users (ID)",
-                value="\n".join([f"{m.name} ({m.id})" for m in matches]) if matches else "None",
-                inline=False
-            )
-            embed.add_field(name="Keyword Matches", value=str(len(keyword_matches)), inline=False)
-            embed.add_field(
-                name="Matched Users (Keyword)",
-                value="\n".join([f"{m.name} ({m.id})" for m in keyword_matches]) if keyword_matches else "None",
-                inline=False
-            )
-            await interaction.followup.send(embed=embed, ephemeral=True)
+            banlist = self.banlist.snapshot
+            # Deltas applied mid-scan only add coverage, so the starting version is the one to report
+            screened_version = banlist.version
+
+            # Without a chunked member cache (e.g. LOW_MEMORY) the cached scan would miss most members
+            if stream or not guild.chunked:
+                checkpoint = ScanCheckpoint(guild_id)
+                if restart:
+                    checkpoint.clear()
+                elif checkpoint.load():
+                    print(f"Resuming firstrun for {guild_id} after member {checkpoint.last_member_id}")
+                report = FirstrunReport(total=guild.member_count or 0)
+                report.checked, report.matched = checkpoint.checked, checkpoint.matched
+                report.banned, report.failed = checkpoint.banned, checkpoint.failed
+                await report.start(interaction, self._log_channel(guild_id))
+                await self._firstrun_streamed(guild, report, banlist, checkpoint)
+                checkpoint.clear()
+            else:
+                report = FirstrunReport(total=len(guild.members))
+                await report.start(interaction, self._log_channel(guild_id))
+                await self._firstrun_cached(guild, report, banlist)
+
+            self.settings.set_screened_version(guild_id, screened_version)
+            await report.finish(interaction, guild_id, len(banlist))
         except Exception as e:
             await ErrorHandler.send_error(
                 interaction,
@@ -111,7 +190,7 @@ class BanHandler(commands.Cog):
         behavior = config['keyword_ban_behavior'] if is_keyword else config['id_ban_behavior']
 
         if behavior == "auto":
-            await member.ban(reason=reason)
+            await self.executor.submit(f"ban:{guild_id}", lambda: member.ban(reason=reason))
             if config['dm_on_ban']:
                 # Your existing DM logic
                 pass
@@ -120,13 +199,158 @@ class BanHandler(commands.Cog):
                 pass
         elif behavior == "notify" and config['notify_staff']:
             # Notify staff instead of banning
-            channel_id = Utils.load_channels(Utils).get(guild_id)
-            if channel_id:
-                channel = self.bot.get_channel(channel_id)
-                await channel.send(f"⚠️ Found match for {member.mention}: {reason}")
+            self.outbox.post(self._log_channel(guild_id), f"⚠️ Found match for {member.mention}: {reason}")
 
     async def ban_with_appeal(self, member: discord.Member, reason: str, keyword: str = None, guild_id: str = None):
-        """Ban a member and send them an appeal link if configured"""
+        """Ban a member and send them an appeal link if configured.
+
+        Returns "banned", "notified", "ignored" or "failed". Every outcome is
+        recorded in the ban ledger.
+        """
+        status = "failed"
+        try:
+            status = await self._ban_with_appeal(member, reason, keyword, guild_id)
+            return status
+        finally:
+            self._record_outcome(member, "keyword" if keyword else "id", status, reason, keyword)
+
+    def _record_outcome(self, member, trigger: str, status: str, reason: str, keyword: str = None) -> None:
+        self.ledger.record(
+            member.id, member.guild.id, trigger, status,
+            reason=reason, keyword=keyword
+        )
+        if status != "ignored":
+            self.counters.increment(
+                member.guild.id, COUNTER_TRIGGERS.get(status, trigger)
+            )
+
+    @staticmethod
+    def _ban_reason(member, trigger: str) -> str:
+        if trigger == "id":
+            return f"Despawner banned {member.id}"
+        return "Banned for forbidden keyword in username/nickname/bio."
+
+    async def ban_many_with_appeal(self, guild: discord.Guild, matches):
+        """Ban several members of one guild with as few REST calls as possible.
+
+        ``matches`` are (member, trigger, keyword) tuples. Members the guild
+        config says to ban go through ``Guild.bulk_ban``, up to
+        BULK_BAN_LIMIT per request; notify/ignore matches, single bans and
+        discord.py versions without bulk_ban use ban_with_appeal. Returns
+        (member, trigger, keyword, status) tuples.
+        """
+        guild_id = str(guild.id)
+        config = self.config_manager.get_guild_config(guild_id)
+        bulk, single = [], []
+        for match in matches:
+            behavior = config['keyword_ban_behavior'] if match[1] == "keyword" else config['id_ban_behavior']
+            (single if behavior in ('ignore', 'notify') else bulk).append(match)
+        if len(bulk) < 2 or not hasattr(guild, "bulk_ban"):
+            single, bulk = single + bulk, []
+
+        async def ban_one(member, trigger, keyword):
+            try:
+                status = await self.ban_with_appeal(
+                    member, self._ban_reason(member, trigger), keyword=keyword, guild_id=guild_id
+                )
+            except Exception:
+                status = "failed"
+            return member, trigger, keyword, status or "failed"
+
+        # The executor bounds concurrency and paces requests per rate limit bucket
+        outcomes = list(await asyncio.gather(*[ban_one(*match) for match in single]))
+        for start in range(0, len(bulk), BULK_BAN_LIMIT):
+            outcomes.extend(await self._bulk_ban(guild, bulk[start:start + BULK_BAN_LIMIT], config))
+        return outcomes
+
+    async def _bulk_ban(self, guild: discord.Guild, matches, config):
+        """Ban up to BULK_BAN_LIMIT members in one request and map the result back per member"""
+        guild_id = str(guild.id)
+        members = [member for member, _, _ in matches]
+        error = None
+        try:
+            result = await self.executor.submit(
+                f"bulk_ban:{guild_id}",
+                lambda: guild.bulk_ban(members, reason=f"Despawner bulk ban of {len(members)} members")
+            )
+            banned_ids = {user.id for user in result.banned}
+        except (discord.HTTPException, RateLimitedError) as e:
+            banned_ids = set()
+            error = e
+
+        outcomes, banned, failed = [], [], []
+        for member, trigger, keyword in matches:
+            status = "banned" if member.id in banned_ids else "failed"
+            reason = self._ban_reason(member, trigger)
+            self._record_outcome(member, trigger, status, reason, keyword)
+            outcomes.append((member, trigger, keyword, status))
+            if status == "banned":
+                banned.append((member, keyword))
+                if config['log_bans']:
+                    details = f"Banned {member} ({member.id})"
+                    if keyword:
+                        details += f"\nTrigger: Keyword '{keyword}'"
+                    self.logger.log_action(guild_id, "Member Banned", f"{details}\nReason: {reason}", str(member.id))
+            else:
+                failed.append(member)
+
+        if config['dm_on_ban']:
+            for member, keyword in banned:
+                self._queue_ban_dm(member, keyword)
+
+        channel = self._log_channel(guild_id)
+        if banned and config['log_bans']:
+            self.outbox.post_embed(channel, discord.Embed(
+                title=f"🔨 Bulk banned {len(banned)} members",
+                description=self._member_list([member for member, _ in banned]),
+                color=discord.Color.blue()
+            ))
+        if failed:
+            embed = discord.Embed(
+                title=f"❌ Ban Failed for {len(failed)} members",
+                description=self._member_list(failed),
+                color=discord.Color.red()
+            )
+            if error is not None:
+                embed.add_field(name="Error Type", value=f"`{error.__class__.__name__}`", inline=False)
+            self.outbox.post_embed(channel, embed)
+        return outcomes
+
+    def _log_channel(self, guild_id):
+        """The guild's configured log channel, or None if unset or not visible"""
+        channel_id = self.settings.get_channel(str(guild_id))
+        return self.bot.get_channel(channel_id) if channel_id else None
+
+    @staticmethod
+    def _member_list(members, limit: int = 4000) -> str:
+        """Mentions for an embed description, cut off before Discord's 4096 character limit"""
+        lines = []
+        length = 0
+        for i, member in enumerate(members):
+            line = f"{member.mention} ({member.id})"
+            if length + len(line) + 1 > limit - 20:
+                lines.append(f"...and {len(members) - i} more")
+                break
+            lines.append(line)
+            length += len(line) + 1
+        return "\n".join(lines)
+
+    def _queue_ban_dm(self, member: discord.Member, keyword: str = None) -> None:
+        """Hand the ban DM to the DM queue, which sends it in the background"""
+        dm_message = "You have been banned due to your alleged connection with Spawnism or forbidden content."
+        if keyword:
+            dm_message += f"\nBan triggered by keyword: **{keyword}**."
+
+        appeal_link = self.settings.get_appeal_link(str(member.guild.id))
+        if appeal_link:
+            dm_message += f"\nIf you believe this is a mistake, you may appeal here: {appeal_link}"
+
+        if not self.dm_queue.put(member, dm_message):
+            print(f"DM queue full: ban DM to {member.id} dropped")
+
+    async def _ban_with_appeal(self, member: discord.Member, reason: str, keyword: str = None, guild_id: str = None):
+        # Log messages are queued on the outbox; none of them wait on Discord
+        channel = self._log_channel(member.guild.id)
         try:
             # Get guild config
             config = self.config_manager.get_guild_config(str(guild_id or member.guild.id))
@@ -134,19 +358,16 @@ class BanHandler(commands.Cog):
             # Check ban behavior based on type
             behavior = config['keyword_ban_behavior'] if keyword else config['id_ban_behavior']
             if behavior == 'ignore':
-                return
+                return "ignored"
                 
             # Handle notify-only mode
             if behavior == 'notify':
-                channel_id = Utils.load_channels(Utils).get(str(member.guild.id))
-                if channel_id and config['notify_staff']:
-                    channel = self.bot.get_channel(channel_id)
-                    await channel.send(f"⚠️ Found match for {member.mention}: {reason}")
-                return
+                if config['notify_staff']:
+                    self.outbox.post(channel, f"⚠️ Found match for {member.mention}: {reason}")
+                return "notified"
 
             # Proceed with ban
-            await member.ban(reason=reason)
-            Utils.increment_ban_count(Utils)
+            await self.executor.submit(f"ban:{member.guild.id}", lambda: member.ban(reason=reason))
 
             log_details = f"Banned {member} ({member.id})"
             if keyword:
@@ -154,120 +375,168 @@ class BanHandler(commands.Cog):
             log_details += f"\nReason: {reason}"
 
             # Log the action
-            if config['log_bans']:
-                channel_id = Utils.load_channels(Utils).get(str(member.guild.id))
-                if channel_id:
-                    channel = self.bot.get_channel(channel_id)
-                    await self.logger.send_log_embed(
-                        channel=channel,
-                        action_type="Member Banned",
-                        details=log_details,
-                        target_id=str(member.id)
-                    )
+            if config['log_bans'] and channel:
+                await self.logger.send_log_embed(
+                    channel=channel,
+                    action_type="Member Banned",
+                    details=log_details,
+                    target_id=str(member.id)
+                )
 
             # Handle DM if enabled
             if config['dm_on_ban']:
-                dm_message = "You have been banned due to your alleged connection with Spawnism or forbidden content."
-                if keyword:
-                    dm_message += f"\nBan triggered by keyword: **{keyword}**."
-                
-                appeal_link = Utils.load_appeal_link(Utils, str(member.guild.id))
-                if appeal_link:
-                    dm_message += f"\nIf you believe this is a mistake, you may appeal here: {appeal_link}"
-                    
-                try:
-                    await member.send(dm_message)
-                except discord.HTTPException:
-                    pass  # Failed to DM user
+                self._queue_ban_dm(member, keyword)
 
             # Log ban if enabled
             if config['log_bans']:
-                channel_id = Utils.load_channels(Utils).get(str(member.guild.id))
-                if channel_id:
-                    channel = self.bot.get_channel(channel_id)
-                    await channel.send(f"🔨 Banned {member.mention}: {reason}")
+                self.outbox.post(channel, f"🔨 Banned {member.mention}: {reason}")
+            return "banned"
 
         except discord.Forbidden:
             error_details = f"Failed to ban {member} ({member.id}): Missing permissions"
-            await self.logger.send_log_embed(
-                channel=channel,
-                action_type="Ban Failed",
-                details=error_details,
-                target_id=str(member.id)
-            )
-            channel_id = Utils.load_channels(Utils).get(str(member.guild.id))
-            if channel_id:
-                channel = self.bot.get_channel(channel_id)
-                if channel:
-                    embed = discord.Embed(
-                        title="❌ Ban Failed",
-                        description=f"Unable to ban {member.mention}: Missing permissions",
-                        color=discord.Color.red()
-                    )
-                    await channel.send(embed=embed)
+            if channel:
+                await self.logger.send_log_embed(
+                    channel=channel,
+                    action_type="Ban Failed",
+                    details=error_details,
+                    target_id=str(member.id)
+                )
+                self.outbox.post_embed(channel, discord.Embed(
+                    title="❌ Ban Failed",
+                    description=f"Unable to ban {member.mention}: Missing permissions",
+                    color=discord.Color.red()
+                ))
+            return "failed"
         except discord.HTTPException as e:
             error_details = f"Failed to ban {member} ({member.id}): {str(e)}"
-            await self.logger.send_log_embed(
-                channel=channel,
-                action_type="Ban Failed",
-                details=error_details,
-                target_id=str(member.id)
-            )
-            channel_id = Utils.load_channels(Utils).get(str(member.guild.id))
-            if channel_id:
-                channel = self.bot.get_channel(channel_id)
-                if channel:
-                    embed = discord.Embed(
-                        title="❌ Ban Failed",
-                        description=f"Unable to ban {member.mention}: {str(e)}",
-                        color=discord.Color.red()
-                    )
-                    embed.add_field(
-                        name="Error Type",
-                        value=f"`{e.__class__.__name__}`",
-                        inline=False
-                    )
-                    await channel.send(embed=embed)
+            if channel:
+                await self.logger.send_log_embed(
+                    channel=channel,
+                    action_type="Ban Failed",
+                    details=error_details,
+                    target_id=str(member.id)
+                )
+                embed = discord.Embed(
+                    title="❌ Ban Failed",
+                    description=f"Unable to ban {member.mention}: {str(e)}",
+                    color=discord.Color.red()
+                )
+                embed.add_field(
+                    name="Error Type",
+                    value=f"`{e.__class__.__name__}`",
+                    inline=False
+                )
+                self.outbox.post_embed(channel, embed)
+            return "failed"
 
     @commands.Cog.listener()
     async def on_member_join(self, member):
-        guild_id = str(member.guild.id)
-        channel_id = Utils.load_channels(Utils).get(guild_id)
-        channel = self.bot.get_channel(channel_id) if channel_id else None
+        if not self.join_queue.put(member):
+            print(f"Join queue full ({self.join_queue.policy}): {member.id} in {member.guild.id} not screened yet")
+
+    async def _resolve_member(self, guild_id: int, member_id: int):
+        """Look a spilled join back up, or None if they've already left"""
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
+            return None
+        member = guild.get_member(member_id)
+        if member is None:
+            try:
+                member = await guild.fetch_member(member_id)
+            except discord.NotFound:
+                return None
+        return member
 
-        if member.id == self.bot.user.id:
+    async def _process_joins(self, members):
+        """Screen a batch of joined members: one banlist lookup, one keyword pass, then the bans"""
+        matches = self._find_matches(members, self.banlist.snapshot)
+        if not matches:
             return
 
-        banned = False
-        for row in Utils.read_csv_as_list_of_dicts(Utils, "thelist.csv"):
-            user_id = str(row.get('id', '')).strip()
-            if user_id and str(member.id) == user_id:
-                await self.utils.ban_with_appeal(member, 
-                    f"Despawner banned {member.id}", 
-                    guild_id=guild_id
-                )
-                if channel:
-                    await channel.send(f'{member.mention} has been banned from the server.')
-                banned = True
-                break
+        by_guild = {}
+        for match in matches:
+            by_guild.setdefault(match[0].guild.id, []).append(match)
+
+        async def ban_guild(guild_matches):
+            guild = guild_matches[0][0].guild
+            outcomes = await self.ban_many_with_appeal(guild, guild_matches)
+            notices = []
+            for member, trigger, keyword, status in outcomes:
+                if status != "banned":
+                    continue
+                if trigger == "id":
+                    notices.append(f'{member.mention} has been banned from the server.')
+                else:
+                    notices.append(f'{member.mention} has been banned for forbidden keyword "{keyword}"')
+
+            # The outbox packs the whole batch into as few messages as fit
+            channel = self._log_channel(guild.id)
+            for notice in notices:
+                self.outbox.post(channel, notice)
+
+        await asyncio.gather(*[ban_guild(guild_matches) for guild_matches in by_guild.values()])
+
+    @staticmethod
+    def _changed_fields(before, after) -> Set[str]:
+        old, new = member_fields(before), member_fields(after)
+        return {field for field, value in new.items() if value and value != old[field]}
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before, after):
+        changed = self._changed_fields(before, after)
+        if changed:
+            self._schedule_rescreen(after.id, {after.guild.id: changed})
+
+    @commands.Cog.listener()
+    async def on_user_update(self, before, after):
+        # Usernames and display names are global; re-screen every guild we share with them
+        changed = self._changed_fields(before, after) - {"nick"}
+        if changed:
+            self._schedule_rescreen(after.id, {guild.id: changed for guild in after.mutual_guilds})
+
+    def _schedule_rescreen(self, user_id: int, changes: Dict[int, Set[str]]) -> None:
+        """Queue changed fields for a user, restarting their debounce timer"""
+        if user_id == self.bot.user.id:
+            return
+        pending = self._rescreen_pending.setdefault(user_id, {})
+        for guild_id, fields in changes.items():
+            pending.setdefault(guild_id, set()).update(fields)
+        timer = self._rescreen_timers.pop(user_id, None)
+        if timer is not None:
+            timer.cancel()
+        self._rescreen_timers[user_id] = asyncio.get_running_loop().call_later(
+            RESCREEN_DELAY, self._start_rescreen, user_id
+        )
 
-        if not banned:
-            username = str(member.name)
-            nickname = str(member.nick) if member.nick else ""
-            bio = str(member.global_name) if member.global_name else ""
-            for field in [username, nickname, bio]:
-                keyword = Utils.contains_banned_keyword(Utils, field)
-                if keyword:
-                    await self.utils.ban_with_appeal(member, 
-                        f"Banned for forbidden keyword", 
-                        keyword=keyword,
-                        guild_id=guild_id
-                    )
-                    if channel:
-                        await channel.send(
-                            f'{member.mention} has been banned for forbidden keyword "{keyword}"'
-                        )
-                    break
+    def _start_rescreen(self, user_id: int) -> None:
+        task = asyncio.create_task(self._rescreen(user_id))
+        self._rescreen_tasks.add(task)
+        task.add_done_callback(self._rescreen_done)
+
+    def _rescreen_done(self, task: asyncio.Task) -> None:
+        self._rescreen_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Re-screen failed: {task.exception()}")
+
+    async def _rescreen(self, user_id: int) -> None:
+        """Run the keyword check on just the fields a user changed, in each guild it changed in"""
+        self._rescreen_timers.pop(user_id, None)
+        pending = self._rescreen_pending.pop(user_id, {})
+        for guild_id, fields in pending.items():
+            guild = self.bot.get_guild(guild_id)
+            member = guild.get_member(user_id) if guild else None
+            if member is None:
+                continue
+            current = member_fields(member)
+            hit = Utils.keyword_matcher().best(
+                Utils.find_banned_keywords(Utils, {field: current[field] for field in fields})
+            )
+            if hit is None:
+                continue
+            try:
+                await self.ban_many_with_appeal(guild, [(member, "keyword", hit.keyword)])
+            except Exception as e:
+                print(f"Re-screening {user_id} in {guild_id} failed: {e}")
 
     @ban_firstrun.error
     async def ban_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
@@ -291,12 +560,52 @@ class BanHandler(commands.Cog):
     @app_commands.checks.has_permissions(administrator=True)
     async def reload_bans(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
-        old_count = len(self.banned_ids)
-        self.reload_banned_ids()
-        new_count = len(self.banned_ids)
+        old_count = len(self.banlist)
+        snapshot = await self.banlist.reload_async()
         
         await interaction.followup.send(
-            f"✅ Banned IDs reloaded\nPrevious entries: {old_count}\nNew entries: {new_count}",
+            f"✅ Banned IDs reloaded\nPrevious entries: {old_count}\nNew entries: {len(snapshot)}\n"
+            f"Load time: {snapshot.load_time * 1000:.1f}ms (v{snapshot.version})",
+            ephemeral=True
+        )
+
+    @ban_group.command(name="version", description="Show the banlist version and when this server was last screened")
+    @app_commands.checks.has_permissions(ban_members=True)
+    async def ban_version(self, interaction: discord.Interaction):
+        stats = self.banlist.stats()
+        lines = [
+            f"Banlist: v{stats['version']} ({stats['entries']} entries)",
+            f"Base v{stats['base_version']} + {stats['pending_deltas']} deltas since the last compaction",
+        ]
+        screened = self.settings.get_screened_version(interaction.guild_id)
+        if screened is None:
+            lines.append("This server has not been screened with `/ban firstrun` yet.")
+        else:
+            lines.append(f"This server was last screened against v{screened['version']} on <t:{screened['at']}:f>.")
+            if screened["version"] < stats["version"]:
+                lines.append("Run `/ban firstrun` to check existing members against the newer entries.")
+        await interaction.response.send_message("\n".join(lines), ephemeral=True)
+
+    @ban_group.command(name="queue", description="Show ban queue depth and throughput")
+    @app_commands.checks.has_permissions(ban_members=True)
+    async def ban_queue(self, interaction: discord.Interaction):
+        stats = self.executor.stats()
+        joins = self.join_queue.stats()
+        outbox = self.outbox.stats()
+        dms = self.dm_queue.stats()
+        rate_limited = sum(stats["rate_limited"].values())
+        await interaction.response.send_message(
+            f"Queued: {stats['queued']}\nIn flight: {stats['in_flight']}\n"
+            f"Throughput: {stats['throughput_per_s']}/s\n"
+            f"Succeeded: {stats['succeeded']} | Failed: {stats['failed']} | 429s: {rate_limited}\n\n"
+            f"Joins waiting: {joins['depth']}/{joins['maxsize']} ({joins['policy']})\n"
+            f"Screened: {joins['processed']} in {joins['batches']} batches (avg {joins['avg_batch']})\n"
+            f"Dropped: {joins['dropped']} | Spilled: {joins['spilled']} ({joins['pending_spill']} pending)\n\n"
+            f"Log messages waiting: {outbox['pending']} in {outbox['channels']} channels\n"
+            f"Sent: {outbox['sent']} | Failed: {outbox['failed']} | Dropped: {outbox['dropped']}\n\n"
+            f"DMs waiting: {dms['depth']}/{dms['maxsize']} ({dms['retrying']} retrying)\n"
+            f"Delivered: {dms['delivered']} | Failed: {dms['failed']} | Dropped: {dms['dropped']} | "
+            f"Deduplicated: {dms['deduplicated']}",
             ephemeral=True
         )
 
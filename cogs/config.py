@@ -2,13 +2,12 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 from utils.utils import Utils
-from utils.config import ConfigManager
 from utils.error_handler import ErrorHandler
 
 class ConfigCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.config_manager = ConfigManager()
+        self.config_manager = bot.services.config
 
     config_group = app_commands.Group(name="config", description="Configuration commands")
 
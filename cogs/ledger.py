@@ -0,0 +1,86 @@
+import time
+import discord
+from discord import app_commands
+from discord.ext import commands
+from typing import Literal, Optional
+from utils.error_handler import ErrorHandler
+
+PAGE_SIZE = 10
+
+class LedgerCog(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.ledger = bot.services.ledger
+
+    @app_commands.command(name="ledger", description="Look up past bans recorded by the bot")
+    @app_commands.describe(
+        user_id="Only show entries for this user ID",
+        trigger="Only show bans triggered by an ID match or a keyword",
+        hours="Only show entries from the last N hours",
+        before="Paging cursor: show entries older than this entry number",
+        all_guilds="Search every guild (bot owner only)"
+    )
+    @app_commands.checks.has_permissions(ban_members=True)
+    async def ledger_search(self, interaction: discord.Interaction, user_id: Optional[str] = None,
+                            trigger: Optional[Literal["id", "keyword"]] = None, hours: Optional[int] = None,
+                            before: Optional[int] = None, all_guilds: bool = False):
+        if all_guilds and not await self.bot.is_owner(interaction.user):
+            await ErrorHandler.send_error(
+                interaction,
+                "Permission Denied",
+                "Only the bot owner can search across guilds.",
+                error_type="NotOwner"
+            )
+            return
+        if user_id is not None and not user_id.strip().isdigit():
+            await ErrorHandler.send_error(interaction, "Invalid User ID", f"`{user_id}` is not a user ID.")
+            return
+
+        await interaction.response.defer(ephemeral=True)
+        rows = await self.ledger.query_async(
+            limit=PAGE_SIZE,
+            user_id=int(user_id) if user_id else None,
+            guild_id=None if all_guilds else interaction.guild_id,
+            trigger=trigger,
+            since=time.time() - hours * 3600 if hours else None,
+            before_id=before
+        )
+
+        embed = discord.Embed(title="📜 Ban Ledger", color=discord.Color.blue())
+        if not rows:
+            embed.description = "No matching entries."
+        for row in rows:
+            detail = f"Trigger: {row['trigger']}"
+            if row['keyword']:
+                detail += f" (`{row['keyword']}`)"
+            if all_guilds:
+                detail += f"\nGuild: {row['guild_id']}"
+            detail += f"\nStatus: {row['status']}\nWhen: <t:{int(row['created_at'])}:f>"
+            if row['reason']:
+                detail += f"\nReason: {row['reason'][:200]}"
+            embed.add_field(name=f"#{row['id']} - User {row['user_id']}", value=detail, inline=False)
+        if len(rows) == PAGE_SIZE:
+            embed.set_footer(text=f"More results: run again with before={rows[-1]['id']}")
+
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+    @ledger_search.error
+    async def ledger_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        if isinstance(error, app_commands.MissingPermissions):
+            await ErrorHandler.send_error(
+                interaction,
+                "Permission Denied",
+                "You need Ban Members permission to use this command.",
+                error_type="MissingPermissions"
+            )
+        else:
+            await ErrorHandler.send_error(
+                interaction,
+                "Command Error",
+                str(error),
+                error_type=error.__class__.__name__,
+                show_help=True
+            )
+
+async def setup(bot):
+    await bot.add_cog(LedgerCog(bot))
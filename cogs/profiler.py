@@ -0,0 +1,113 @@
+import asyncio
+import io
+import signal
+import discord
+from discord import app_commands
+from discord.ext import commands
+from typing import Optional
+from utils.error_handler import ErrorHandler
+from utils.profiler import ProfileSession
+
+MAX_PROFILE_SECONDS = 600
+
+class ProfilerCog(commands.Cog):
+    """Owner-only profiling of the running bot.
+
+    Use /profile, or send SIGUSR1 once to start and again to stop; signal
+    reports are written to profiles/.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._joins_target: Optional[int] = None
+        self._joins_reached = asyncio.Event()
+        self._signal_session: Optional[ProfileSession] = None
+
+    async def cog_load(self):
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, self._toggle_signal_profile)
+        except (NotImplementedError, AttributeError):
+            pass  # No SIGUSR1 on Windows
+
+    async def cog_unload(self):
+        try:
+            asyncio.get_running_loop().remove_signal_handler(signal.SIGUSR1)
+        except (NotImplementedError, AttributeError):
+            pass
+
+    def _toggle_signal_profile(self):
+        if self._signal_session is None:
+            session = ProfileSession()
+            try:
+                session.start()
+            except (RuntimeError, ValueError) as e:
+                print(f"Profiler: {e}")
+                return
+            self._signal_session = session
+            print("Profiler started (send SIGUSR1 again to stop)")
+        else:
+            session, self._signal_session = self._signal_session, None
+            report = session.stop()
+            try:
+                path = session.save(report)
+            except OSError as e:
+                print(f"Profiler stopped, but the report could not be written: {e}")
+                return
+            print(f"Profiler stopped, report written to {path}")
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        session = ProfileSession.active()
+        if session is None:
+            return
+        session.joins += 1
+        if self._joins_target is not None and session.joins >= self._joins_target:
+            self._joins_reached.set()
+
+    @app_commands.command(name="profile", description="Profile the bot for a while (owner only)")
+    @app_commands.describe(
+        seconds="How long to profile for (max 600)",
+        joins="Stop early after this many member joins"
+    )
+    async def profile(self, interaction: discord.Interaction, seconds: int = 30, joins: Optional[int] = None):
+        if not await self.bot.is_owner(interaction.user):
+            await ErrorHandler.send_error(
+                interaction,
+                "Permission Denied",
+                "Only the bot owner can profile the bot.",
+                error_type="NotOwner"
+            )
+            return
+
+        session = ProfileSession()
+        try:
+            session.start()
+        except (RuntimeError, ValueError) as e:
+            await ErrorHandler.send_error(interaction, "Profiler Busy", str(e))
+            return
+
+        # The session is stopped however this ends, even if the interaction has already expired
+        try:
+            seconds = max(1, min(seconds, MAX_PROFILE_SECONDS))
+            await interaction.response.send_message(
+                f"⏱️ Profiling for up to {seconds}s" + (f" or {joins} joins" if joins else "") + "...",
+                ephemeral=True
+            )
+            self._joins_target = joins
+            self._joins_reached.clear()
+            try:
+                await asyncio.wait_for(self._joins_reached.wait(), timeout=seconds)
+            except asyncio.TimeoutError:
+                pass
+        finally:
+            self._joins_target = None
+            report = session.stop()
+
+        await interaction.followup.send(
+            "📈 Profile complete",
+            file=discord.File(io.BytesIO(report.encode()), filename="profile.txt"),
+            ephemeral=True
+        )
+
+async def setup(bot):
+    await bot.add_cog(ProfilerCog(bot))
@@ -1,12 +1,12 @@
 import discord
+from discord import app_commands
 from discord.ext import commands, tasks
 from itertools import cycle
-from utils.utils import Utils
+from utils.counters import TRIGGERS
 
 class BotStatus(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.utils = Utils()
         self.change_status.start()
 
     def cog_unload(self):
@@ -14,7 +14,7 @@ class BotStatus(commands.Cog):
 
     @tasks.loop(minutes=5)
     async def change_status(self):
-        ban_count = self.utils.load_ban_count()
+        ban_count = self.bot.services.counters.total_bans
         statuses = cycle([
             discord.Activity(
                 type=discord.ActivityType.playing,
@@ -43,5 +43,26 @@ class BotStatus(commands.Cog):
     async def on_ready(self):
         print(f"{self.__class__.__name__} cog loaded")
 
+    @app_commands.command(name="stats", description="Show ban statistics")
+    async def stats(self, interaction: discord.Interaction):
+        counters = self.bot.services.counters
+        labels = {"id": "ID Matches", "keyword": "Keyword Matches", "notify": "Staff Notified", "failure": "Failed Bans"}
+        embed = discord.Embed(title="📊 Ban Statistics", color=discord.Color.blue())
+        if interaction.guild_id:
+            guild_counts = counters.guild_counts(interaction.guild_id)
+            embed.add_field(
+                name="This Server",
+                value="\n".join(f"{labels[t]}: {guild_counts[t]}" for t in TRIGGERS),
+                inline=True
+            )
+        totals = counters.totals()
+        embed.add_field(
+            name="All Servers",
+            value="\n".join(f"{labels[t]}: {totals[t]}" for t in TRIGGERS),
+            inline=True
+        )
+        embed.add_field(name="Total Bans", value=str(counters.total_bans), inline=False)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
 async def setup(bot):
     await bot.add_cog(BotStatus(bot))
\ No newline at end of file
@@ -2,13 +2,12 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 from utils.utils import Utils
-from utils.config import ConfigManager
 from utils.error_handler import ErrorHandler
 
 class TestingCog(commands.GroupCog, name="test"):
     def __init__(self, bot):
         self.bot = bot
-        self.config_manager = ConfigManager()
+        self.config_manager = bot.services.config
         super().__init__()
 
     @app_commands.command(name="bandetection", description="Test ban detection without banning")
@@ -0,0 +1,59 @@
+"""Compile banlist sources into thelist.csv and the bot's compiled index.
+
+Inputs can be plain text (``<id> <name>`` per line), CSV or JSONL, and are
+streamed, validated, deduplicated and sorted in bounded memory.
+
+Examples:
+    python3 compile_banlist.py thelist.txt
+    python3 compile_banlist.py export.jsonl extra.csv --rejects rejects.csv
+    python3 compile_banlist.py huge.txt --chunk-size 2000000 --tmp-dir /var/tmp
+"""
+import argparse
+import os
+import sys
+from typing import List, Optional
+from utils.banlist_compiler import FORMATS, compile_banlist
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build thelist.csv and thelist.bin from banlist exports")
+    parser.add_argument("inputs", nargs="+", help="Files to read, in priority order for usernames")
+    parser.add_argument("-o", "--output", default="thelist.csv", help="CSV to write (default: thelist.csv)")
+    parser.add_argument("--bin", help="Compiled index to write (default: next to the CSV, .bin)")
+    parser.add_argument("--format", choices=FORMATS, help="Input format (default: from each file's extension)")
+    parser.add_argument("--rejects", help="Write every rejected line to this CSV")
+    parser.add_argument("--chunk-size", type=int, default=1_000_000, help="Records sorted in memory at a time")
+    parser.add_argument("--tmp-dir", help="Where to put the sort's run files (default: system temp)")
+    parser.add_argument("--no-names", action="store_true", help="Leave usernames out of the compiled index")
+    parser.add_argument("--list-version", type=int,
+                        help="Record the list version this export is at, so only newer deltas are applied on top")
+    args = parser.parse_args(argv)
+
+    for path in args.inputs:
+        if not os.path.isfile(path):
+            print(f"Input {path} not found", file=sys.stderr)
+            return 1
+
+    stats = compile_banlist(
+        args.inputs, args.output, bin_path=args.bin, rejects_path=args.rejects, fmt=args.format,
+        chunk_size=args.chunk_size, with_names=not args.no_names, tmp_dir=args.tmp_dir
+    )
+    if args.list_version is not None:
+        # Replaced atomically: a truncated file would read as version 0 and replay every delta
+        version_path = os.path.splitext(args.output)[0] + ".version"
+        with open(f"{version_path}.tmp", 'w') as f:
+            f.write(str(args.list_version))
+        os.replace(f"{version_path}.tmp", version_path)
+
+    print(f"Read {stats['read']} lines in {stats['seconds']}s ({stats['rows_per_s']}/s, {stats['runs']} sort runs)")
+    print(f"Wrote {stats['written']} IDs to {args.output} and {args.bin or os.path.splitext(args.output)[0] + '.bin'}")
+    print(f"Dropped {stats['duplicates']} duplicates")
+    if stats["rejected"]:
+        reasons = ", ".join(f"{reason}: {count}" for reason, count in sorted(stats["reject_reasons"].items()))
+        where = f", listed in {args.rejects}" if args.rejects else " (use --rejects to list them)"
+        print(f"Rejected {stats['rejected']} lines ({reasons}){where}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
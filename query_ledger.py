@@ -0,0 +1,72 @@
+"""Query the ban ledger from the command line.
+
+Examples:
+    python3 query_ledger.py --user 1412600377894764564
+    python3 query_ledger.py --guild 1391815230924787775 --trigger keyword --hours 24
+    python3 query_ledger.py --since 2026-10-01 --until 2026-10-02 --format jsonl
+"""
+import argparse
+import json
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from utils.ledger import BanLedger
+
+
+def parse_time(value: str) -> float:
+    """Accept a unix timestamp or an ISO date/datetime"""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Search the ban ledger")
+    parser.add_argument("--db", help="Path to the ledger database (default: ban_ledger.db)")
+    parser.add_argument("--user", type=int, help="Filter by user ID")
+    parser.add_argument("--guild", type=int, help="Filter by guild ID")
+    parser.add_argument("--trigger", choices=["id", "keyword"], help="Filter by trigger type")
+    parser.add_argument("--hours", type=float, help="Only entries from the last N hours")
+    parser.add_argument("--since", type=parse_time, help="Only entries at or after this time")
+    parser.add_argument("--until", type=parse_time, help="Only entries before this time")
+    parser.add_argument("--before", type=int, help="Paging cursor: only entries older than this entry number")
+    parser.add_argument("--limit", type=int, help="Maximum number of rows (default: all)")
+    parser.add_argument("--format", choices=["table", "jsonl"], default="table")
+    args = parser.parse_args()
+
+    since = args.since
+    if args.hours is not None:
+        since = time.time() - args.hours * 3600
+
+    # Read-only: a mistyped --db is an error, not a new empty ledger
+    try:
+        ledger = BanLedger(args.db, read_only=True)
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        return 1
+    rows = ledger.iter_query(
+        limit=args.limit, user_id=args.user, guild_id=args.guild, trigger=args.trigger,
+        since=since, until=args.until, before_id=args.before
+    )
+    count = 0
+    try:
+        for row in rows:
+            count += 1
+            if args.format == "jsonl":
+                print(json.dumps(row))
+            else:
+                when = datetime.fromtimestamp(row["created_at"]).isoformat(sep=" ", timespec="seconds")
+                keyword = f" ({row['keyword']})" if row["keyword"] else ""
+                print(f"#{row['id']}\t{when}\tguild={row['guild_id']}\tuser={row['user_id']}\t"
+                      f"{row['trigger']}{keyword}\t{row['status']}\t{row['reason'] or ''}")
+    except sqlite3.DatabaseError as e:
+        print(f"Could not read {ledger.path}: {e}", file=sys.stderr)
+        return 1
+    print(f"{count} entries", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,6 +11,32 @@ if command -v poetry >/dev/null 2>&1; then
     source "${POETRY_PATH}/bin/activate"
 fi
 
+# Sharded mode: SHARD_COUNT=<total shards> PROCESSES=<n> ./start.sh splits the
+# shards into n contiguous groups and runs one bot process per group, each
+# with its own bot-<n>.log and bot-<n>.pid. If METRICS_PORT is set, process n
+# serves metrics on METRICS_PORT + n.
+PROCESSES=${PROCESSES:-1}
+if [ -n "$SHARD_COUNT" ] && [ "$PROCESSES" -gt 1 ]; then
+    PER_PROCESS=$(( (SHARD_COUNT + PROCESSES - 1) / PROCESSES ))
+    for (( n = 0; n < PROCESSES; n++ )); do
+        FIRST=$(( n * PER_PROCESS ))
+        LAST=$(( FIRST + PER_PROCESS - 1 ))
+        [ "$FIRST" -ge "$SHARD_COUNT" ] && break
+        [ "$LAST" -ge "$SHARD_COUNT" ] && LAST=$(( SHARD_COUNT - 1 ))
+
+        PROCESS_ENV=(SHARD_COUNT="$SHARD_COUNT" SHARD_IDS="$(seq -s, "$FIRST" "$LAST")")
+        if [ -n "$METRICS_PORT" ]; then
+            PROCESS_ENV+=(METRICS_PORT=$(( METRICS_PORT + n )))
+        fi
+
+        echo "Starting bot process $n (shards $FIRST-$LAST of $SHARD_COUNT)..."
+        env "${PROCESS_ENV[@]}" nohup python3 bot.py > "bot-$n.log" 2>&1 &
+        echo $! > "bot-$n.pid"
+        echo "Process $n started with PID $(cat "bot-$n.pid"), logging to bot-$n.log"
+    done
+    exit 0
+fi
+
 # Start the bot with nohup
 echo "Starting bot..."
 nohup python3 bot.py > bot.log 2>&1 &
@@ -18,4 +44,4 @@ nohup python3 bot.py > bot.log 2>&1 &
 # Save the process ID
 echo $! > bot.pid
 echo "Bot started with PID $(cat bot.pid)"
-echo "Logs are being written to bot.log"
\ No newline at end of file
+echo "Logs are being written to bot.log"
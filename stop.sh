@@ -4,12 +4,19 @@
 DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )"
 cd "$DIR"
 
-if [ -f bot.pid ]; then
-    PID=$(cat bot.pid)
+# bot.pid for a single process, bot-<n>.pid for each sharded process
+STOPPED=0
+for PID_FILE in bot.pid bot-*.pid; do
+    [ -f "$PID_FILE" ] || continue
+    PID=$(cat "$PID_FILE")
     echo "Stopping bot process (PID: $PID)..."
     kill $PID
-    rm bot.pid
+    rm "$PID_FILE"
+    STOPPED=1
+done
+
+if [ "$STOPPED" -eq 1 ]; then
     echo "Bot stopped"
 else
     echo "No bot.pid file found"
-fi
\ No newline at end of file
+fi
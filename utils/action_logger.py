@@ -1,56 +1,139 @@
+import asyncio
 import discord
+import gzip
 import json
 import os
+import shutil
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Any, Dict, Iterator, Optional, TextIO, Tuple
+from utils.metrics import REST_LATENCY
+from utils.outbox import ChannelOutbox
+
+SEGMENT_FORMAT = "%Y%m%d%H"
+
 
 class ActionLogger:
-    def __init__(self):
-        self.root_dir = Path(__file__).parent.parent / "logs"
+    """Append-only action log, one JSONL segment per guild per hour.
+
+    Logs live in ``logs/<guild_id>/<YYYYMMDDHH>.jsonl``. Writing an entry is
+    a single line-buffered append to the current hour's segment. When the
+    hour rolls over, segments older than ``retention_hours`` are deleted
+    whole, or gzipped into ``logs/<guild_id>/archive/`` when
+    ``compress_expired`` is set.
+
+    ``send_log_embed`` also posts the entry to the guild's log channel,
+    through a ChannelOutbox if one is given so the caller never waits on it.
+    """
+
+    def __init__(self, retention_hours: int = 24, compress_expired: bool = False, max_open_files: int = 64,
+                 outbox: Optional[ChannelOutbox] = None, root_dir: Optional[Path] = None):
+        self.root_dir = Path(root_dir or Path(__file__).parent.parent / "logs")
         self.root_dir.mkdir(exist_ok=True)
+        self.retention_hours = retention_hours
+        self.compress_expired = compress_expired
+        self.max_open_files = max_open_files
+        # Log embeds go out batched through the outbox when one is given
+        self.outbox = outbox
+        # guild_id -> (segment name, open handle), least recently used first
+        self._segments: "OrderedDict[str, Tuple[str, TextIO]]" = OrderedDict()
+        now = datetime.now()
+        for guild_dir in self.root_dir.iterdir():
+            if guild_dir.is_dir():
+                self._expire_segments(guild_dir.name, now)
+
+    def _guild_dir(self, guild_id: str) -> Path:
+        return self.root_dir / str(guild_id)
+
+    def _segment(self, guild_id: str, now: datetime) -> TextIO:
+        """Open handle for the guild's current segment, rotating if the hour changed"""
+        name = now.strftime(SEGMENT_FORMAT)
+        current = self._segments.get(guild_id)
+        if current is not None and current[0] == name:
+            self._segments.move_to_end(guild_id)
+            return current[1]
+
+        if current is not None:
+            current[1].close()
+            del self._segments[guild_id]
+            self._expire_segments(guild_id, now)
+        elif len(self._segments) >= self.max_open_files:
+            _, (_, oldest) = self._segments.popitem(last=False)
+            oldest.close()
 
-    def _get_log_file(self, guild_id: str) -> Path:
-        return self.root_dir / f"{guild_id}_actions.json"
+        guild_dir = self._guild_dir(guild_id)
+        guild_dir.mkdir(exist_ok=True)
+        handle = open(guild_dir / f"{name}.jsonl", 'a', buffering=1, encoding='utf-8')
+        self._segments[guild_id] = (name, handle)
+        return handle
 
-    def _load_logs(self, guild_id: str) -> List[Dict[str, Any]]:
-        log_file = self._get_log_file(guild_id)
-        if log_file.exists():
+    def _expired(self, guild_id: str, now: datetime):
+        cutoff = (now - timedelta(hours=self.retention_hours)).strftime(SEGMENT_FORMAT)
+        for path in self._guild_dir(guild_id).glob("*.jsonl"):
+            # Segment names sort chronologically, and a segment is only expired
+            # once its whole hour is older than the retention window
+            if path.stem < cutoff:
+                yield path
+
+    def _drop_segments(self, paths) -> None:
+        for path in paths:
             try:
-                with open(log_file, 'r') as f:
-                    logs = json.load(f)
-                return logs
-            except json.JSONDecodeError:
-                return []
-        return []
-
-    def _save_logs(self, guild_id: str, logs: List[Dict[str, Any]]) -> None:
-        log_file = self._get_log_file(guild_id)
-        with open(log_file, 'w') as f:
-            json.dump(logs, f, indent=2)
+                if self.compress_expired:
+                    archive = path.parent / "archive"
+                    archive.mkdir(exist_ok=True)
+                    with open(path, 'rb') as src, gzip.open(archive / f"{path.name}.gz", 'wb') as dst:
+                        shutil.copyfileobj(src, dst)
+                path.unlink()
+            except OSError as e:
+                print(f"Error expiring log segment {path}: {e}")
+
+    def _expire_segments(self, guild_id: str, now: datetime) -> None:
+        expired = list(self._expired(guild_id, now))
+        if not expired:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._drop_segments(expired)
+            return
+        # Compression can take a while; keep it off the event loop
+        loop.run_in_executor(None, self._drop_segments, expired)
 
     def log_action(self, guild_id: str, action_type: str, details: str, target_id: str = None) -> None:
         """Log an action with timestamp"""
-        logs = self._load_logs(guild_id)
-        
-        # Add new log
-        logs.append({
-            "timestamp": datetime.now().isoformat(),
+        now = datetime.now()
+        entry = {
+            "timestamp": now.isoformat(),
             "type": action_type,
             "details": details,
             "target_id": target_id
-        })
-        
-        # Remove logs older than 24 hours
-        current_time = datetime.now()
-        logs = [
-            log for log in logs 
-            if current_time - datetime.fromisoformat(log["timestamp"]) < timedelta(hours=24)
-        ]
-        
-        self._save_logs(guild_id, logs)
-
-    async def send_log_embed(self, channel: discord.TextChannel, action_type: str, 
+        }
+        self._segment(str(guild_id), now).write(json.dumps(entry) + "\n")
+
+    def read_logs(self, guild_id: str, hours: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Yield logged entries for a guild, oldest first, from the last ``hours`` hours"""
+        cutoff = (datetime.now() - timedelta(hours=hours or self.retention_hours)).strftime(SEGMENT_FORMAT)
+        guild_id = str(guild_id)
+        if guild_id in self._segments:
+            self._segments[guild_id][1].flush()
+        for path in sorted(self._guild_dir(guild_id).glob("*.jsonl")):
+            if path.stem < cutoff:
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Partial line from a crash mid-write
+
+    def close(self) -> None:
+        """Flush and close every open segment"""
+        while self._segments:
+            _, (_, handle) = self._segments.popitem()
+            handle.close()
+
+    async def send_log_embed(self, channel: discord.TextChannel, action_type: str,
                            details: str, target_id: str = None) -> None:
         """Send a log message to the specified channel and save it"""
         embed = discord.Embed(
@@ -59,11 +142,15 @@ class ActionLogger:
             color=discord.Color.blue(),
             timestamp=datetime.now()
         )
-        
+
         if target_id:
             embed.add_field(name="Target ID", value=target_id, inline=False)
-            
+
         embed.set_footer(text="This log will be archived after 24 hours")
-        
-        await channel.send(embed=embed)
-        self.log_action(str(channel.guild.id), action_type, details, target_id)
\ No newline at end of file
+
+        if self.outbox is not None:
+            self.outbox.post_embed(channel, embed)
+        else:
+            with REST_LATENCY.labels("log").time():
+                await channel.send(embed=embed)
+        self.log_action(str(channel.guild.id), action_type, details, target_id)
@@ -0,0 +1,181 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from utils.metrics import RATE_LIMITED, REST_LATENCY, route_label
+
+T = TypeVar("T")
+
+# Discord allows 50 requests per second per bot across all routes.
+GLOBAL_RATE = 50.0
+
+
+class TokenBucket:
+    """Token bucket whose rate adapts to the rate limits Discord reports"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, min_rate: float = 0.5):
+        self.rate = rate
+        self.max_rate = rate
+        self.min_rate = min_rate
+        self.capacity = capacity or max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent on this bucket"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def block(self, seconds: float) -> None:
+        """Hold every request on this bucket for ``seconds``"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+    def apply_headers(self, limit: Optional[int], reset_after: Optional[float]) -> None:
+        """Adopt the limit/window Discord advertised for this bucket"""
+        if limit and reset_after:
+            self.max_rate = self.rate = max(self.min_rate, limit / reset_after)
+            self.capacity = float(limit)
+
+    def backoff(self) -> None:
+        """Halve the rate after a 429 (multiplicative decrease)"""
+        self.rate = max(self.min_rate, self.rate / 2)
+
+    def recover(self) -> None:
+        """Creep the rate back up after a success (additive increase)"""
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+
+class RateLimitedError(Exception):
+    """Raised when a request still hits 429 after every retry"""
+
+
+def _rate_limit_info(error: Exception) -> Optional[Dict[str, Any]]:
+    """Pull the 429 details out of a discord.HTTPException (or a fake of one)"""
+    if getattr(error, "status", None) != 429:
+        return None
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    retry_after = headers.get("Retry-After") or headers.get("X-RateLimit-Reset-After") or 1.0
+    limit = headers.get("X-RateLimit-Limit")
+    reset_after = headers.get("X-RateLimit-Reset-After")
+    return {
+        "retry_after": float(retry_after),
+        "global": str(headers.get("X-RateLimit-Global", "")).lower() == "true"
+                  or headers.get("X-RateLimit-Scope") == "global",
+        "bucket": headers.get("X-RateLimit-Bucket"),
+        "limit": int(limit) if limit else None,
+        "reset_after": float(reset_after) if reset_after else None,
+    }
+
+
+class BanExecutor:
+    """Runs REST calls with bounded concurrency and per-route rate limiting.
+
+    Every call names a route key (for example ``ban:<guild_id>``, matching
+    Discord's per-guild ban bucket). A call waits for a concurrency slot,
+    the global bucket and its route bucket before it is sent. On a 429 the
+    route (or the global bucket, for global limits) is blocked for the
+    advertised ``Retry-After``, its rate is halved, and the call retried.
+    """
+
+    def __init__(self, concurrency: int = 5, route_rate: float = 5.0,
+                 global_rate: float = GLOBAL_RATE, max_retries: int = 5):
+        self.concurrency = concurrency
+        self.route_rate = route_rate
+        self.max_retries = max_retries
+        self.global_bucket = TokenBucket(global_rate)
+        self.routes: Dict[str, TokenBucket] = {}
+        self._slots = asyncio.Semaphore(concurrency)
+        self._completed = deque(maxlen=5000)
+        self.queued = 0
+        self.in_flight = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.rate_limited: Dict[str, int] = {}
+
+    def _bucket(self, route: str) -> TokenBucket:
+        bucket = self.routes.get(route)
+        if bucket is None:
+            bucket = self.routes[route] = TokenBucket(self.route_rate)
+        return bucket
+
+    async def submit(self, route: str, call: Callable[[], Awaitable[T]]) -> T:
+        """Run ``call`` once a slot and rate limit budget are available.
+
+        ``call`` must create a fresh awaitable each time, since it may be
+        retried after a 429.
+        """
+        bucket = self._bucket(route)
+        self.queued += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+        try:
+            return await self._run(route, bucket, call)
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    async def _run(self, route: str, bucket: TokenBucket, call: Callable[[], Awaitable[T]]) -> T:
+        for attempt in range(self.max_retries + 1):
+            await self.global_bucket.acquire()
+            await bucket.acquire()
+            try:
+                with REST_LATENCY.labels(route_label(route)).time():
+                    result = await call()
+            except Exception as e:
+                info = _rate_limit_info(e)
+                if info is None:
+                    self.failed += 1
+                    raise
+                self.rate_limited[route] = self.rate_limited.get(route, 0) + 1
+                RATE_LIMITED.labels(route_label(route)).inc()
+                if attempt == self.max_retries:
+                    self.failed += 1
+                    raise RateLimitedError(f"{route} still rate limited after {attempt + 1} attempts") from e
+                target = self.global_bucket if info["global"] else bucket
+                target.apply_headers(info["limit"], info["reset_after"])
+                target.backoff()
+                # Exponential backoff on top of Retry-After in case it keeps happening
+                target.block(info["retry_after"] * (1.5 ** attempt))
+                continue
+            bucket.recover()
+            self.succeeded += 1
+            self._completed.append(time.monotonic())
+            return result
+
+    def throughput(self, window: float = 60.0) -> float:
+        """Completed calls per second over the last ``window`` seconds"""
+        cutoff = time.monotonic() - window
+        recent = sum(1 for t in self._completed if t >= cutoff)
+        return recent / window
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.queued,
+            "in_flight": self.in_flight,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "throughput_per_s": round(self.throughput(), 2),
+            "rate_limited": dict(self.rate_limited),
+        }
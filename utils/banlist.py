@@ -0,0 +1,429 @@
+import asyncio
+import csv
+import os
+import shutil
+import time
+from array import array
+from bisect import bisect_left
+from itertools import chain, compress
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from utils import compiled_banlist
+from utils.banlist_compiler import CSV_HEADER, compile_banlist, csv_rows
+from utils.banlist_delta import ADD, BanlistDelta, pending_deltas, read_delta
+from utils.metrics import BANLIST_LOOKUP_LATENCY
+from utils.compiled_banlist import CompiledBanlist, CompiledBanlistError, CompiledWriter
+from utils.filelock import file_lock
+
+# Lookups take a few microseconds; a context manager per call would be a big share of that
+_LOOKUP_LATENCY = BANLIST_LOOKUP_LATENCY.labels()
+# Base entries merged with the delta overlay per step of a compaction
+COMPACT_BATCH = 1 << 16
+
+
+class BanlistSnapshot:
+    """One loaded banlist: an immutable compiled base plus the deltas applied since.
+
+    ``ids`` is a CompiledBanlist (or an empty frozenset before the first
+    load) and ``names`` anything with a ``dict``-style ``get``; together
+    they are the list at ``base_version``. ``added`` holds IDs deltas added
+    that aren't in the base, ``removed`` base IDs that deltas removed.
+    Deltas are applied in place on the event loop, one whole delta at a
+    time, so lookups never see half of one.
+    """
+
+    __slots__ = ("ids", "names", "added", "removed", "base_version", "version", "generation",
+                 "mtime", "load_time", "loaded_at")
+
+    def __init__(self, ids, names, base_version: int, mtime: Tuple[float, float], load_time: float):
+        self.ids = ids
+        self.names = names
+        self.added: Dict[int, str] = {}
+        self.removed = set()
+        self.base_version = base_version
+        # List version: the base's, then the last applied delta's
+        self.version = base_version
+        # Bumped on every change, including reloads that keep the version
+        self.generation = 0
+        self.mtime = mtime
+        self.load_time = load_time
+        self.loaded_at = time.time()
+
+    def __len__(self) -> int:
+        return len(self.ids) - len(self.removed) + len(self.added)
+
+    def __contains__(self, user_id) -> bool:
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return False
+        if user_id in self.added:
+            return True
+        return user_id not in self.removed and user_id in self.ids
+
+    def contains_many(self, user_ids) -> list:
+        """Return the subset of ``user_ids`` that are on this snapshot"""
+        user_ids = [int(user_id) for user_id in user_ids]
+        if isinstance(self.ids, CompiledBanlist):
+            hits = self.ids.contains_many(user_ids)
+        else:
+            hits = [user_id for user_id in user_ids if user_id in self.ids]
+        if self.removed:
+            hits = [user_id for user_id in hits if user_id not in self.removed]
+        if self.added:
+            hits.extend(user_id for user_id in set(user_ids) if user_id in self.added)
+        return hits
+
+    def get_name(self, user_id: int) -> str:
+        if user_id in self.added:
+            return self.added[user_id]
+        return self.names.get(user_id, "")
+
+    @property
+    def pending(self) -> int:
+        """Entries held in the delta overlay rather than the compiled base"""
+        return len(self.added) + len(self.removed)
+
+    def apply(self, delta: BanlistDelta) -> None:
+        """Apply one delta in O(len(delta))"""
+        for op, user_id, name in delta.ops:
+            if op == ADD:
+                if user_id in self.removed:
+                    self.removed.discard(user_id)
+                elif user_id not in self.ids:
+                    self.added[user_id] = name or self.added.get(user_id, "")
+            elif user_id in self.added:
+                del self.added[user_id]
+            elif user_id in self.ids:
+                self.removed.add(user_id)
+        self.version = delta.version
+
+
+class BanlistIndex:
+    """Process-wide banlist shared by every cog.
+
+    Lookups go against an in-memory snapshot. Reloads build a complete new
+    snapshot off the event loop and swap it in with a single assignment, so
+    readers never see a half-loaded list.
+
+    The CSV is compiled to a sorted uint64 file next to it (``thelist.bin``)
+    which is memory-mapped, so a loaded list costs about 8 bytes per ID and
+    is shared between processes. The compiled file is reused as long as it
+    is not older than the CSV, and only one process compiles it at a time:
+    the others wait for the lock and then map the finished file.
+
+    The list is versioned. ``thelist.version`` holds the version the CSV is
+    at, and delta files dropped into ``delta_dir`` (see banlist_delta) move
+    it forward without a rebuild. Once ``compact_after`` entries or
+    ``COMPACT_MAX_DELTAS`` files have piled up, the deltas are merged into
+    a new CSV and compiled file and moved to ``delta_dir/applied/``.
+    """
+
+    COMPACT_MAX_DELTAS = 100
+
+    def __init__(self, filepath: str = "thelist.csv", compiled_path: Optional[str] = None,
+                 delta_dir: Optional[str] = None, compact_after: int = 10000):
+        self.filepath = filepath
+        self.compiled_path = compiled_path or os.path.splitext(filepath)[0] + ".bin"
+        self.version_path = os.path.splitext(filepath)[0] + ".version"
+        self.delta_dir = delta_dir or os.path.join(os.path.dirname(filepath), "banlist.d")
+        self.compact_after = compact_after
+        self.snapshot = BanlistSnapshot(frozenset(), {}, 0, (0.0, 0.0), 0.0)
+        # Delta files applied on top of the current base
+        self.applied_deltas = 0
+        self._generation = 0
+        self._reload_lock = asyncio.Lock()
+        self._watch_task: Optional[asyncio.Task] = None
+        self.reload()
+
+    def __len__(self) -> int:
+        return len(self.snapshot)
+
+    def __contains__(self, user_id) -> bool:
+        return user_id in self.snapshot
+
+    @property
+    def version(self) -> int:
+        return self.snapshot.version
+
+    @property
+    def generation(self) -> int:
+        return self.snapshot.generation
+
+    def contains(self, user_id) -> bool:
+        """Check if a user ID is on the banlist"""
+        started = time.perf_counter()
+        found = user_id in self.snapshot
+        _LOOKUP_LATENCY.observe(time.perf_counter() - started)
+        return found
+
+    def contains_many(self, user_ids) -> list:
+        """Return the subset of ``user_ids`` that are on the banlist"""
+        started = time.perf_counter()
+        hits = self.snapshot.contains_many(user_ids)
+        _LOOKUP_LATENCY.observe(time.perf_counter() - started)
+        return hits
+
+    def get_name(self, user_id) -> str:
+        """Get the username recorded for a banned ID, if any"""
+        try:
+            return self.snapshot.get_name(int(user_id))
+        except (TypeError, ValueError):
+            return ""
+
+    @staticmethod
+    def _mtime(path: str) -> float:
+        try:
+            return os.stat(path).st_mtime
+        except OSError:
+            return 0.0
+
+    def _current_mtime(self) -> Tuple[float, float]:
+        return self._mtime(self.filepath), self._mtime(self.compiled_path)
+
+    def _read_csv(self) -> Iterator[Tuple[int, str]]:
+        try:
+            with open(self.filepath, 'r', encoding='utf-8') as f:
+                for line in f:
+                    # First column is the ID, second (optional) is the username.
+                    # Header and blank lines fail the isdigit check and are skipped.
+                    parts = line.strip().split(',', 1)
+                    user_id = parts[0].strip()
+                    if user_id.isdigit():
+                        name = parts[1].strip() if len(parts) > 1 else ""
+                        if name.startswith('"'):
+                            # Quoted by compile_banlist.py because it contains a comma or quote
+                            name = next(csv.reader([name]), [""])[0]
+                        yield int(user_id), name
+        except FileNotFoundError:
+            print(f"Banlist file {self.filepath} not found.")
+
+    def _compile(self) -> CompiledBanlist:
+        """Compile the CSV, preferring an on-disk mmap over a private buffer (lock held)"""
+        inputs = [self.filepath] if os.path.exists(self.filepath) else []
+        if not inputs:
+            print(f"Banlist file {self.filepath} not found.")
+        try:
+            # Streams the CSV through a bounded external sort instead of holding every entry
+            stats = compile_banlist(inputs, None, bin_path=self.compiled_path, fmt="csv", lock=False)
+            if stats["rejected"]:
+                reasons = ", ".join(f"{reason}: {count}" for reason, count in sorted(stats["reject_reasons"].items()))
+                print(f"Skipped {stats['rejected']} invalid lines in {self.filepath} ({reasons})")
+            return CompiledBanlist.open(self.compiled_path)
+        except (OSError, CompiledBanlistError) as e:
+            print(f"Could not write compiled banlist {self.compiled_path}: {e}")
+            return CompiledBanlist(compiled_banlist.build(self._read_csv()))
+
+    def _open_compiled(self) -> Optional[CompiledBanlist]:
+        """Map the compiled file if it's at least as new as the CSV"""
+        csv_mtime, bin_mtime = self._current_mtime()
+        if bin_mtime and bin_mtime >= csv_mtime:
+            try:
+                return CompiledBanlist.open(self.compiled_path)
+            except (OSError, CompiledBanlistError) as e:
+                print(f"Ignoring compiled banlist {self.compiled_path}: {e}")
+        return None
+
+    def _read_version(self) -> int:
+        try:
+            with open(self.version_path, 'r') as f:
+                return int(f.read().strip() or "0")
+        except FileNotFoundError:
+            return 0
+        except (ValueError, OSError) as e:
+            print(f"Ignoring {self.version_path}: {e}")
+            return 0
+
+    def _read_deltas(self, after: int) -> List[BanlistDelta]:
+        deltas = []
+        for version, path in pending_deltas(self.delta_dir, after):
+            try:
+                deltas.append(read_delta(version, path))
+            except OSError as e:
+                # Leave it for the next poll rather than skipping its version
+                print(f"Could not read banlist delta {path}: {e}")
+                break
+        return deltas
+
+    def _load(self) -> Tuple[BanlistSnapshot, int]:
+        """Load the base and every pending delta into a new snapshot (blocking)"""
+        started = time.perf_counter()
+        # Read the version first: if a compaction lands in between, replaying
+        # deltas the new base already contains is harmless
+        base_version = self._read_version()
+        ids = self._open_compiled()
+        if ids is None:
+            with file_lock(self.compiled_path):
+                # Another process may have compiled it while we waited
+                ids = self._open_compiled() or self._compile()
+        snapshot = BanlistSnapshot(ids, ids.names, base_version, self._current_mtime(), 0.0)
+        deltas = self._read_deltas(base_version)
+        for delta in deltas:
+            snapshot.apply(delta)
+        snapshot.load_time = time.perf_counter() - started
+        return snapshot, len(deltas)
+
+    def _next_generation(self) -> int:
+        self._generation += 1
+        return self._generation
+
+    def _swap(self, loaded: Tuple[BanlistSnapshot, int]) -> BanlistSnapshot:
+        snapshot, self.applied_deltas = loaded
+        snapshot.generation = self._next_generation()
+        self.snapshot = snapshot
+        print(f"Loaded {len(snapshot)} banned IDs (v{snapshot.version}, {self.applied_deltas} deltas) "
+              f"in {snapshot.load_time * 1000:.1f}ms")
+        return snapshot
+
+    def reload(self) -> BanlistSnapshot:
+        """Reload the banlist synchronously. Only use this outside the event loop."""
+        return self._swap(self._load())
+
+    async def reload_async(self) -> BanlistSnapshot:
+        """Reload the banlist in a worker thread and swap it in atomically"""
+        async with self._reload_lock:
+            snapshot = await asyncio.to_thread(self._load)
+            return self._swap(snapshot)
+
+    async def reload_if_changed(self) -> bool:
+        """Reload only if the file's mtime differs from the loaded snapshot"""
+        if self._current_mtime() == self.snapshot.mtime:
+            return False
+        await self.reload_async()
+        return True
+
+    async def apply_new_deltas(self) -> int:
+        """Apply delta files newer than the loaded version. Returns how many were applied."""
+        async with self._reload_lock:
+            snapshot = self.snapshot
+            deltas = await asyncio.to_thread(self._read_deltas, snapshot.version)
+            if self.snapshot is not snapshot:
+                return 0
+            entries = 0
+            for delta in deltas:
+                snapshot.apply(delta)
+                entries += len(delta)
+            if deltas:
+                snapshot.generation = self._next_generation()
+                self.applied_deltas += len(deltas)
+                print(f"Applied {len(deltas)} banlist deltas ({entries} entries), now v{snapshot.version}")
+            return len(deltas)
+
+    def _needs_compaction(self) -> bool:
+        return (self.snapshot.pending >= self.compact_after
+                or self.applied_deltas >= self.COMPACT_MAX_DELTAS)
+
+    def _compact(self, base, added: Dict[int, str], removed: set, version: int) -> bool:
+        """Write base + overlay as the new CSV, compiled file and version (blocking)"""
+        with file_lock(self.compiled_path):
+            if self._read_version() >= version:
+                return False  # Another process already compacted this far
+            tmp_path = f"{self.filepath}.tmp"
+            writer = CompiledWriter(self.compiled_path)
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(CSV_HEADER + "\n")
+                    for ids, names in self._merged_batches(base, added, removed):
+                        f.write(csv_rows(ids, names))
+                        writer.add_many(ids, names)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.filepath)
+                # Closed after the CSV is in place, so the compiled file is never older than it
+                writer.close()
+            except BaseException:
+                writer.abort()
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+            with open(f"{self.version_path}.tmp", 'w') as f:
+                f.write(str(version))
+            os.replace(f"{self.version_path}.tmp", self.version_path)
+            # Oldest first, so a reader listing mid-move only replays a suffix
+            applied_dir = os.path.join(self.delta_dir, "applied")
+            os.makedirs(applied_dir, exist_ok=True)
+            for delta_version, path in pending_deltas(self.delta_dir, 0):
+                if delta_version <= version:
+                    shutil.move(path, os.path.join(applied_dir, os.path.basename(path)))
+        return True
+
+    @staticmethod
+    def _merged_batches(base, added: Dict[int, str], removed: set) -> Iterator[Tuple[array, List[str]]]:
+        """The base minus ``removed`` merged with ``added``, in sorted batches.
+
+        The base is already sorted and unique, and deltas only add IDs it
+        doesn't have, so each base batch just takes in the added IDs that
+        fall before its end; only a batch at a time is held in memory.
+        """
+        if not isinstance(base, CompiledBanlist):
+            base = CompiledBanlist(compiled_banlist.build((user_id, "") for user_id in base))
+        extra = sorted(added.items())
+        taken = 0
+        count = len(base)
+        for start in range(0, count, COMPACT_BATCH):
+            stop = min(start + COMPACT_BATCH, count)
+            ids = array("Q", base[start:stop])
+            names = base.names.slice(start, stop)
+            if removed:
+                keep = [user_id not in removed for user_id in ids]
+                ids, names = array("Q", compress(ids, keep)), list(compress(names, keep))
+            if not ids and stop < count:
+                continue
+            # The last batch takes whatever is left of the overlay
+            end = bisect_left(extra, (ids[-1] + 1,)) if stop < count else len(extra)
+            if end > taken:
+                merged = sorted(chain(zip(ids, names), extra[taken:end]))
+                ids, names = array("Q", [user_id for user_id, _ in merged]), [name for _, name in merged]
+                taken = end
+            if ids:
+                yield ids, names
+        if taken < len(extra):
+            rest = extra[taken:]
+            yield array("Q", [user_id for user_id, _ in rest]), [name for _, name in rest]
+
+    async def compact(self) -> bool:
+        """Fold the applied deltas into a new base, then reload onto it"""
+        snapshot = self.snapshot
+        if not snapshot.pending and not self.applied_deltas:
+            return False
+        # Copy the overlay here; deltas keep being applied on the loop meanwhile
+        compacted = await asyncio.to_thread(
+            self._compact, snapshot.ids, dict(snapshot.added), set(snapshot.removed), snapshot.version
+        )
+        if compacted:
+            print(f"Compacted banlist deltas into {self.filepath} at v{snapshot.version}")
+        await self.reload_async()
+        return compacted
+
+    def start_watching(self, interval: float = 30.0) -> None:
+        """Poll the banlist file and hot reload it whenever it changes"""
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.create_task(self._watch(interval))
+
+    def stop_watching(self) -> None:
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            self._watch_task = None
+
+    async def _watch(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await self.reload_if_changed():
+                    await self.apply_new_deltas()
+                if self._needs_compaction():
+                    await self.compact()
+            except Exception as e:
+                print(f"Error reloading banlist: {e}")
+
+    def stats(self) -> Dict[str, float]:
+        """Summary of the currently loaded snapshot"""
+        snapshot = self.snapshot
+        return {
+            "entries": len(snapshot),
+            "version": snapshot.version,
+            "base_version": snapshot.base_version,
+            "pending_deltas": self.applied_deltas,
+            "load_time_ms": round(snapshot.load_time * 1000, 2),
+            "loaded_at": snapshot.loaded_at,
+        }
@@ -0,0 +1,390 @@
+import contextlib
+import csv
+import gc
+import json
+import os
+import tempfile
+import time
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from itertools import compress, islice
+from operator import not_
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from utils.compiled_banlist import CompiledWriter
+from utils.filelock import file_lock
+
+FORMATS = ("txt", "csv", "jsonl")
+CSV_HEADER = "id,username"
+DISCORD_EPOCH_MS = 1420070400000
+# Allow for clock skew between whoever exported the list and this machine
+FUTURE_SLACK_MS = 24 * 3600 * 1000
+MAX_NAME_LENGTH = 100
+# Input is parsed and validated this many bytes at a time
+BLOCK_BYTES = 1 << 22
+# Entries held in memory across all runs being merged, split evenly between them
+MERGE_ENTRIES = 1 << 20
+# Most runs merged at once; more are merged in passes, so open files stay bounded too
+MAX_FAN_IN = 64
+
+# (line numbers, raw IDs, names) for one block of input
+ParsedBlock = Tuple[Sequence[int], List[Optional[str]], List[str]]
+Batch = Tuple[array, List[str]]
+
+
+def detect_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if ext == ".csv":
+        return "csv"
+    return "txt"
+
+
+def _line_blocks(f) -> Iterator[Tuple[int, List[str]]]:
+    """(first line number, lines) in blocks of about BLOCK_BYTES"""
+    line_no = 1
+    while True:
+        lines = f.readlines(BLOCK_BYTES)
+        if not lines:
+            return
+        yield line_no, lines
+        line_no += len(lines)
+
+
+def _parse_txt(f) -> Iterator[ParsedBlock]:
+    """``<id> <name...>`` per line, as exported by the registry"""
+    for first, lines in _line_blocks(f):
+        parts = [line.split(None, 1) for line in lines]
+        numbers: Sequence[int] = range(first, first + len(lines))
+        if not all(parts):
+            numbers = list(compress(numbers, parts))
+            parts = [p for p in parts if p]
+        yield numbers, [p[0] for p in parts], [p[1].strip() if len(p) > 1 else "" for p in parts]
+
+
+def _parse_csv(f) -> Iterator[ParsedBlock]:
+    """ID in the first column (or ``id``/``user_id``), name in the second (or ``username``/``name``)"""
+    id_col, name_col = 0, 1
+    for first, lines in _line_blocks(f):
+        rows = list(csv.reader(lines))
+        numbers: Sequence[int] = range(first, first + len(rows))
+        if first == 1 and rows and rows[0] and not rows[0][0].strip().isdigit():
+            columns = [c.strip().lower() for c in rows[0]]
+            id_col = next((columns.index(c) for c in ("id", "user_id") if c in columns), 0)
+            name_col = next((columns.index(c) for c in ("username", "name") if c in columns), 1)
+            rows, numbers = rows[1:], numbers[1:]
+        if not all(rows):
+            numbers = list(compress(numbers, rows))
+            rows = [row for row in rows if row]
+        yield (numbers,
+               [row[id_col] if len(row) > id_col else None for row in rows],
+               [row[name_col] if len(row) > name_col else "" for row in rows])
+
+
+def _parse_jsonl(f) -> Iterator[ParsedBlock]:
+    """One object per line with ``id`` (or ``user_id``) and optionally ``username`` (or ``name``)"""
+    for first, lines in _line_blocks(f):
+        numbers, ids, names = [], [], []
+        for line_no, line in enumerate(lines, first):
+            if not line.strip():
+                continue
+            try:
+                obj = json.loads(line)
+            except json.JSONDecodeError:
+                obj = None
+            numbers.append(line_no)
+            if isinstance(obj, dict) and obj.get("id", obj.get("user_id")) is not None:
+                ids.append(str(obj.get("id", obj.get("user_id"))))
+                names.append(str(obj.get("username") or obj.get("name") or ""))
+            else:
+                ids.append(None)
+                names.append(line)
+        yield numbers, ids, names
+
+
+PARSERS = {"txt": _parse_txt, "csv": _parse_csv, "jsonl": _parse_jsonl}
+
+
+def check_id(raw: Optional[str], now_ms: int) -> Tuple[int, Optional[str]]:
+    """``(id, None)`` for a valid snowflake, else ``(0, reason)``"""
+    if raw is None:
+        return 0, "unparseable line"
+    raw = raw.strip()
+    if not raw.isascii() or not raw.isdigit():
+        return 0, "not a number"
+    user_id = int(raw)
+    if user_id >= 1 << 64:
+        return 0, "out of range"
+    timestamp = user_id >> 22
+    if timestamp == 0:
+        return 0, "too small to be a snowflake"
+    if timestamp + DISCORD_EPOCH_MS > now_ms + FUTURE_SLACK_MS:
+        return 0, "timestamp in the future"
+    return user_id, None
+
+
+def _clean_names(names: List[str]) -> List[str]:
+    """Names fit on one CSV line and are at most MAX_NAME_LENGTH long"""
+    text = "".join(names)
+    if "\n" in text or "\r" in text or "\t" in text:
+        names = [" ".join(name.split()) for name in names]
+    if max(map(len, names), default=0) > MAX_NAME_LENGTH:
+        names = [name[:MAX_NAME_LENGTH] for name in names]
+    return names
+
+
+def _validate(block: ParsedBlock, now_ms: int,
+              reject: Callable[[int, str, str], None]) -> Tuple[array, List[str]]:
+    """The block's valid IDs and names.
+
+    The whole block is checked at once first; only a block containing a
+    bad line is walked line by line.
+    """
+    numbers, raw_ids, names = block
+    try:
+        if None in raw_ids:
+            raise ValueError
+        digits = "".join(raw_ids)
+        if not digits.isascii() or not digits.isdigit():
+            raise ValueError
+        ids = array("Q", map(int, raw_ids))
+        if ids and ((min(ids) >> 22) == 0 or (max(ids) >> 22) + DISCORD_EPOCH_MS > now_ms + FUTURE_SLACK_MS):
+            raise ValueError
+        return ids, _clean_names(names)
+    except (ValueError, OverflowError):
+        pass
+    ids = array("Q")
+    kept = []
+    for line_no, raw_id, name in zip(numbers, raw_ids, names):
+        user_id, reason = check_id(raw_id, now_ms)
+        if reason:
+            reject(line_no, reason, (raw_id or name).strip()[:200])
+        else:
+            ids.append(user_id)
+            kept.append(name)
+    return ids, _clean_names(kept)
+
+
+def _sort_unique(ids: array, names: List[str]) -> Batch:
+    """Sort by ID and drop duplicates, keeping the first non-empty name of each"""
+    has_name = list(map(bool, names))
+    if not any(has_name):
+        keys = sorted(set(ids))
+        return array("Q", keys), [""] * len(keys)
+    if all(has_name):
+        # Reversed, so the first occurrence is the one left in the dict
+        unique = dict(zip(reversed(ids), reversed(names)))
+    else:
+        unique = dict.fromkeys(compress(ids, map(not_, has_name)), "")
+        unique.update(zip(reversed(list(compress(ids, has_name))), reversed(list(compress(names, has_name)))))
+    keys = sorted(unique)
+    return array("Q", keys), list(map(unique.__getitem__, keys))
+
+
+def csv_row(user_id: int, name: str) -> str:
+    """One ``id,username`` line, quoting the name only when it needs it"""
+    if ',' in name or '"' in name:
+        name = '"' + name.replace('"', '""') + '"'
+    return f"{user_id},{name}\n"
+
+
+def csv_rows(ids: array, names: List[str]) -> str:
+    """``csv_row`` for a whole batch"""
+    text = "".join(names)
+    if ',' in text or '"' in text:
+        return "".join(map(csv_row, ids, names))
+    return "".join([f"{user_id},{name}\n" for user_id, name in zip(ids, names)])
+
+
+class _Run:
+    """A sorted, duplicate-free run on disk, read back a block at a time"""
+
+    def __init__(self, directory: str, batches: Iterable[Batch]):
+        fd, self.path = tempfile.mkstemp(suffix=".run", dir=directory)
+        self.remaining = 0
+        with os.fdopen(fd, 'wb') as f, open(f"{self.path}.names", 'w', encoding='utf-8') as names_file:
+            for ids, names in batches:
+                if not ids:
+                    continue
+                ids.tofile(f)
+                names_file.write("\n".join(names))
+                names_file.write("\n")
+                self.remaining += len(ids)
+        self.ids = array("Q")
+        self.names: List[str] = []
+        self.pos = 0
+        self.block = 0
+
+    def open(self, block: int) -> None:
+        self.block = block
+        self._ids_file = open(self.path, 'rb')
+        self._names_file = open(f"{self.path}.names", 'r', encoding='utf-8')
+        self.load()
+
+    def load(self) -> bool:
+        """Read the next block. Returns False once the run is used up."""
+        count = min(self.block, self.remaining)
+        self.remaining -= count
+        self.ids = array("Q")
+        self.ids.fromfile(self._ids_file, count)
+        self.names = [line[:-1] for line in islice(self._names_file, count)]
+        self.pos = 0
+        return count > 0
+
+    def close(self) -> None:
+        """Close and delete the run, which has been merged"""
+        self._ids_file.close()
+        self._names_file.close()
+        os.unlink(self.path)
+        os.unlink(f"{self.path}.names")
+
+
+def _merge(runs: List[_Run], stats: Dict) -> Iterator[Batch]:
+    """Merge sorted runs in batches, earlier runs winning name ties.
+
+    Each step takes every entry up to the smallest last ID among the runs'
+    current blocks. Runs are duplicate-free, so all copies of an ID land
+    in the same step. The runs share MERGE_ENTRIES of block space, so a
+    step never holds more than that however many runs there are.
+    """
+    block = max(1, MERGE_ENTRIES // len(runs))
+    for run in runs:
+        run.open(block)
+    active = [run for run in runs if len(run.ids)]
+    while active:
+        bound = min(run.ids[-1] for run in active)
+        ids = array("Q")
+        names: List[str] = []
+        for run in active:
+            end = bisect_right(run.ids, bound, run.pos)
+            ids.extend(run.ids[run.pos:end])
+            names.extend(run.names[run.pos:end])
+            run.pos = end
+        batch = _sort_unique(ids, names)
+        stats["duplicates"] += len(ids) - len(batch[0])
+        yield batch
+        active = [run for run in active if run.pos < len(run.ids) or run.load()]
+    for run in runs:
+        run.close()
+
+
+def _merge_all(runs: List[_Run], work_dir: str, stats: Dict) -> Iterator[Batch]:
+    """Merge any number of runs, MAX_FAN_IN at a time, into one sorted stream"""
+    while len(runs) > MAX_FAN_IN:
+        # Groups keep their order, so earlier inputs still win name ties
+        runs = [_Run(work_dir, _merge(runs[i:i + MAX_FAN_IN], stats))
+                for i in range(0, len(runs), MAX_FAN_IN)]
+    return _merge(runs, stats)
+
+
+def compile_banlist(inputs: List[str], csv_path: Optional[str], bin_path: Optional[str] = None,
+                    rejects_path: Optional[str] = None, fmt: Optional[str] = None,
+                    chunk_size: int = 1_000_000, with_names: bool = True,
+                    tmp_dir: Optional[str] = None, lock: bool = True) -> Dict:
+    """Validate, dedupe and sort ``inputs`` into a headed CSV and a compiled banlist.
+
+    An external merge sort: input is parsed and validated BLOCK_BYTES at a
+    time into a chunk, each chunk of ``chunk_size`` entries is deduped,
+    sorted and written to a temporary run, and the runs are merged at the
+    end, at most MAX_FAN_IN at a time, sharing MERGE_ENTRIES of buffer.
+    Memory is bounded by those three, whatever the input size. Both outputs
+    are written in the same pass over the merged entries, the CSV first so
+    the compiled file is never older than it. With ``csv_path`` None only the compiled file is
+    written. Pass ``lock=False`` when already holding ``file_lock(bin_path)``.
+    Returns counts and timings.
+    """
+    started = time.perf_counter()
+    bin_path = bin_path or os.path.splitext(csv_path)[0] + ".bin"
+    now_ms = int(time.time() * 1000)
+    stats = {"read": 0, "rejected": 0, "duplicates": 0, "written": 0, "runs": 0}
+    reasons = Counter()
+    rejects = open(rejects_path, 'w', newline='', encoding='utf-8') if rejects_path else None
+    reject_writer = csv.writer(rejects) if rejects else None
+    if reject_writer:
+        reject_writer.writerow(("source", "line", "reason", "value"))
+    # Millions of short-lived lists and strings; the cyclic GC would only slow them down
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="banlist-", dir=tmp_dir) as work_dir:
+            runs: List[_Run] = []
+            chunk_ids = array("Q")
+            chunk_names: List[str] = []
+
+            def spill() -> None:
+                ids, names = _sort_unique(chunk_ids, chunk_names)
+                stats["duplicates"] += len(chunk_ids) - len(ids)
+                runs.append(_Run(work_dir, [(ids, names)]))
+                del chunk_ids[:], chunk_names[:]
+
+            for path in inputs:
+                def reject(line_no: int, reason: str, value: str) -> None:
+                    stats["rejected"] += 1
+                    reasons[reason] += 1
+                    if reject_writer:
+                        reject_writer.writerow((path, line_no, reason, value))
+
+                parse = PARSERS[fmt or detect_format(path)]
+                with open(path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+                    for block in parse(f):
+                        stats["read"] += len(block[1])
+                        ids, names = _validate(block, now_ms, reject)
+                        chunk_ids.extend(ids)
+                        chunk_names.extend(names if with_names else [""] * len(ids))
+                        if len(chunk_ids) >= chunk_size:
+                            spill()
+            if rejects:
+                rejects.close()
+                rejects = None
+
+            if runs and chunk_ids:
+                spill()
+            stats["runs"] = len(runs)
+            if runs:
+                batches = _merge_all(runs, work_dir, stats)
+            else:
+                single = _sort_unique(chunk_ids, chunk_names)
+                stats["duplicates"] += len(chunk_ids) - len(single[0])
+                batches = iter([single])
+
+            writer = CompiledWriter(bin_path, with_names)
+            csv_tmp = f"{csv_path}.tmp" if csv_path else None
+            try:
+                out = open(csv_tmp, 'w', encoding='utf-8') if csv_tmp else None
+                try:
+                    if out:
+                        out.write(CSV_HEADER + "\n")
+                    for ids, names in batches:
+                        if out:
+                            out.write(csv_rows(ids, names))
+                        writer.add_many(ids, names)
+                    if out:
+                        out.flush()
+                        os.fsync(out.fileno())
+                finally:
+                    if out:
+                        out.close()
+                # The running bot compiles and compacts under this lock too
+                with file_lock(bin_path) if lock else contextlib.nullcontext():
+                    if csv_tmp:
+                        os.replace(csv_tmp, csv_path)
+                    writer.close()
+            except BaseException:
+                writer.abort()
+                if csv_tmp and os.path.exists(csv_tmp):
+                    os.unlink(csv_tmp)
+                raise
+    finally:
+        if rejects:
+            rejects.close()
+        if gc_was_enabled:
+            gc.enable()
+
+    stats["written"] = writer.count
+    stats["reject_reasons"] = dict(reasons)
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    stats["rows_per_s"] = round(stats["read"] / stats["seconds"]) if stats["seconds"] else None
+    return stats
@@ -0,0 +1,68 @@
+import os
+from typing import List, Optional, Tuple
+
+# Delta files live in the drop directory (banlist.d/ by default), one file
+# per list version, named <version>.delta, e.g. 000042.delta. Versions must
+# increase; files at or below the loaded version are ignored. Each line is
+#   +<id>[,<username>]   add an ID
+#   -<id>                remove an ID
+# Blank lines and lines starting with '#' are skipped. Write a delta under
+# another name and rename it into place, so it's never read half-written.
+SUFFIX = ".delta"
+ADD = "+"
+REMOVE = "-"
+
+
+class BanlistDelta:
+    """One parsed delta file: ``ops`` is a list of (op, user_id, name) in file order"""
+
+    __slots__ = ("version", "path", "ops")
+
+    def __init__(self, version: int, path: str, ops: List[Tuple[str, int, str]]):
+        self.version = version
+        self.path = path
+        self.ops = ops
+
+    def __len__(self) -> int:
+        return len(self.ops)
+
+
+def delta_version(filename: str) -> Optional[int]:
+    """The version a delta file name stands for, or None if it isn't one"""
+    stem, suffix = os.path.splitext(filename)
+    if suffix != SUFFIX or not stem.isdigit():
+        return None
+    return int(stem)
+
+
+def pending_deltas(drop_dir: str, after: int) -> List[Tuple[int, str]]:
+    """(version, path) of every delta newer than ``after``, oldest first"""
+    found = []
+    try:
+        with os.scandir(drop_dir) as entries:
+            for entry in entries:
+                version = delta_version(entry.name)
+                if version is not None and version > after and entry.is_file():
+                    found.append((version, entry.path))
+    except FileNotFoundError:
+        return []
+    return sorted(found)
+
+
+def read_delta(version: int, path: str) -> BanlistDelta:
+    """Parse a delta file, skipping (and reporting) malformed lines"""
+    ops = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            op, rest = line[0], line[1:]
+            parts = rest.split(',', 1)
+            user_id = parts[0].strip()
+            if op not in (ADD, REMOVE) or not user_id.isdigit():
+                print(f"Skipping malformed line {line_no} in {path}: {line[:80]}")
+                continue
+            name = parts[1].strip() if op == ADD and len(parts) > 1 else ""
+            ops.append((op, int(user_id), name))
+    return BanlistDelta(version, path, ops)
@@ -0,0 +1,62 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class ScanCheckpoint:
+    """Resumable progress of a streamed firstrun scan for one guild.
+
+    Saved after every chunk whose bans have completed, so a restart picks
+    up after ``last_member_id`` instead of rescanning and re-banning.
+    """
+
+    FIELDS = ("last_member_id", "checked", "matched", "banned", "failed", "started_at")
+
+    def __init__(self, guild_id: str, root_dir: Optional[Path] = None):
+        self.guild_id = str(guild_id)
+        self.root_dir = root_dir or Path(__file__).parent.parent / "checkpoints"
+        self.path = self.root_dir / f"{self.guild_id}_firstrun.json"
+        self.last_member_id = 0
+        self.checked = 0
+        self.matched = 0
+        self.banned = 0
+        self.failed = 0
+        self.started_at = time.time()
+
+    @property
+    def resumed(self) -> bool:
+        return self.last_member_id > 0
+
+    def load(self) -> bool:
+        """Load a previous checkpoint if there is one"""
+        try:
+            with open(self.path, 'r') as f:
+                data: Dict[str, Any] = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Ignoring unreadable checkpoint {self.path}: {e}")
+            return False
+        for field in self.FIELDS:
+            if field in data:
+                setattr(self, field, data[field])
+        return self.resumed
+
+    def save(self) -> None:
+        """Write the checkpoint atomically (temp file + rename)"""
+        self.root_dir.mkdir(exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({field: getattr(self, field) for field in self.FIELDS}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def clear(self) -> None:
+        """Remove the checkpoint once a scan has finished"""
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,32 @@
+from typing import Any, Dict
+import discord
+
+
+def low_memory_intents() -> discord.Intents:
+    """Only what detection needs: guilds, plus member join/update events"""
+    intents = discord.Intents.none()
+    intents.guilds = True
+    intents.members = True
+    return intents
+
+
+def client_options(low_memory: bool = False) -> Dict[str, Any]:
+    """Keyword arguments for the Bot/Client constructor.
+
+    The default profile keeps the historical behaviour: every intent, the
+    full member list of every guild and the library's message cache. The
+    low-memory profile drops presences and messages entirely, skips chunking
+    at startup and only caches members the bot has seen join or change, which
+    is what on_member_update needs to fire. /ban firstrun fetches members
+    from the API on demand when a guild isn't chunked.
+    """
+    if not low_memory:
+        return {"intents": discord.Intents.all()}
+    member_cache_flags = discord.MemberCacheFlags.none()
+    member_cache_flags.joined = True
+    return {
+        "intents": low_memory_intents(),
+        "member_cache_flags": member_cache_flags,
+        "max_messages": None,
+        "chunk_guilds_at_startup": False,
+    }
@@ -0,0 +1,296 @@
+import mmap
+import os
+import shutil
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# On-disk layout (all integers little-endian):
+#   header   MAGIC, format version, flags, entry count, names offset, names size
+#   ids      <count> sorted, unique uint64 snowflakes starting at HEADER.size
+#   names    optional: uint32 offsets[count + 1] followed by a UTF-8 blob,
+#            where the name of ids[i] is blob[offsets[i]:offsets[i + 1]]
+MAGIC = b"DSPNBAN1"
+FORMAT_VERSION = 1
+FLAG_HAS_NAMES = 0x1
+HEADER = struct.Struct("<8sIIQQQ")
+
+
+class CompiledBanlistError(Exception):
+    """Raised when a compiled banlist file is missing, truncated or malformed"""
+
+
+class _NameTable:
+    """Read-only ``dict``-like view over the username side table"""
+
+    def __init__(self, owner: "CompiledBanlist", offsets: Optional[memoryview],
+                 blob: Optional[memoryview]):
+        self._owner = owner
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self) -> int:
+        return len(self._owner) if self._offsets is not None else 0
+
+    def get(self, user_id: int, default: str = "") -> str:
+        if self._offsets is None:
+            return default
+        i = self._owner.index_of(user_id)
+        if i < 0:
+            return default
+        name = bytes(self._blob[self._offsets[i]:self._offsets[i + 1]])
+        return name.decode("utf-8") if name else default
+
+    def slice(self, start: int, stop: int) -> List[str]:
+        """Names of the IDs at positions ``start`` to ``stop``, decoded in one go"""
+        if self._offsets is None:
+            return [""] * (stop - start)
+        offsets = self._offsets[start:stop + 1]
+        base = offsets[0]
+        data = bytes(self._blob[base:offsets[-1]])
+        return [data[a - base:b - base].decode("utf-8") for a, b in zip(offsets, offsets[1:])]
+
+
+class CompiledBanlist:
+    """Sorted uint64 banlist backed by a memory map or an in-memory buffer.
+
+    Costs 8 bytes per ID (plus the optional name table). When opened from a
+    file the pages are shared with every other process mapping the same file.
+    """
+
+    def __init__(self, buffer, source: Optional[mmap.mmap] = None):
+        view = memoryview(buffer)
+        if len(view) < HEADER.size:
+            raise CompiledBanlistError("File is too small to be a compiled banlist")
+        magic, fmt, flags, count, names_offset, names_size = HEADER.unpack_from(view, 0)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise CompiledBanlistError("Not a compiled banlist (bad magic or version)")
+        ids_end = HEADER.size + count * 8
+        if len(view) < ids_end or len(view) < names_offset + names_size:
+            raise CompiledBanlistError("Compiled banlist is truncated")
+
+        self._source = source
+        self._ids = self._cast_u64(view[HEADER.size:ids_end])
+        offsets = blob = None
+        if flags & FLAG_HAS_NAMES:
+            offsets_end = names_offset + (count + 1) * 4
+            offsets = self._cast_u32(view[names_offset:offsets_end])
+            blob = view[offsets_end:names_offset + names_size]
+        self.names = _NameTable(self, offsets, blob)
+
+    @staticmethod
+    def _cast_u64(view: memoryview):
+        if sys.byteorder == "little":
+            return view.cast("Q")
+        ids = array("Q", view.tobytes())
+        ids.byteswap()
+        return ids
+
+    @staticmethod
+    def _cast_u32(view: memoryview):
+        if sys.byteorder == "little":
+            return view.cast("I")
+        offsets = array("I", view.tobytes())
+        offsets.byteswap()
+        return offsets
+
+    @classmethod
+    def open(cls, path: str) -> "CompiledBanlist":
+        """Memory-map a compiled banlist file read-only"""
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise CompiledBanlistError("Compiled banlist is empty")
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapped, source=mapped)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._ids)
+
+    def __getitem__(self, index):
+        """IDs by position; a slice is a view, so sampling doesn't copy the list"""
+        return self._ids[index]
+
+    def __contains__(self, user_id) -> bool:
+        try:
+            return self.index_of(int(user_id)) >= 0
+        except (TypeError, ValueError):
+            return False
+
+    def index_of(self, user_id: int) -> int:
+        """Position of ``user_id`` in the sorted array, or -1"""
+        ids = self._ids
+        i = bisect_left(ids, user_id)
+        if i < len(ids) and ids[i] == user_id:
+            return i
+        return -1
+
+    def contains_many(self, user_ids: Iterable[int]) -> List[int]:
+        """Return the subset of ``user_ids`` that are on the list.
+
+        The queries are sorted first so each binary search only has to look
+        at the part of the array after the previous hit.
+        """
+        ids = self._ids
+        n = len(ids)
+        lo = 0
+        hits = []
+        for user_id in sorted(set(user_ids)):
+            lo = bisect_left(ids, user_id, lo)
+            if lo >= n:
+                break
+            if ids[lo] == user_id:
+                hits.append(user_id)
+        return hits
+
+
+def build(entries: Iterable[Tuple[int, str]], with_names: bool = True) -> bytes:
+    """Serialise ``(id, name)`` pairs into the compiled format.
+
+    Duplicate IDs keep the first non-empty name seen.
+    """
+    names = {}
+    for user_id, name in entries:
+        if user_id < 0 or user_id >= 1 << 64:
+            continue
+        if not names.get(user_id):
+            names[user_id] = name or ""
+    ids = array("Q", sorted(names))
+    if sys.byteorder != "little":
+        ids.byteswap()
+
+    names_blob = b""
+    flags = 0
+    names_offset = HEADER.size + len(ids) * 8
+    if with_names and any(names.values()):
+        flags |= FLAG_HAS_NAMES
+        offsets = array("I", [0])
+        chunks = []
+        total = 0
+        for user_id in sorted(names):
+            encoded = names[user_id].encode("utf-8")
+            chunks.append(encoded)
+            total += len(encoded)
+            offsets.append(total)
+        if sys.byteorder != "little":
+            offsets.byteswap()
+        names_blob = offsets.tobytes() + b"".join(chunks)
+
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, flags, len(ids), names_offset, len(names_blob))
+    return header + ids.tobytes() + names_blob
+
+
+class CompiledWriter:
+    """Write a compiled banlist from batches of IDs that arrive sorted and unique.
+
+    Memory use is bounded by the batch: IDs go straight to ``<path>.tmp``
+    and the name offsets and blob to two side files, which are appended
+    once the count is known. ``close`` fills in the header and renames the
+    file into place.
+    """
+
+    def __init__(self, path: str, with_names: bool = True):
+        self.path = path
+        self.with_names = with_names
+        self.count = 0
+        self.names_size = 0
+        self._last = -1
+        self._file = open(f"{path}.tmp", "wb")
+        self._file.write(b"\0" * HEADER.size)
+        self._side_files = []
+        if with_names:
+            self._offsets_file = open(f"{path}.offsets.tmp", "w+b")
+            self._blob_file = open(f"{path}.names.tmp", "w+b")
+            self._side_files = [self._offsets_file, self._blob_file]
+            self._write_u32(array("I", [0]))
+
+    def _write_u32(self, values: array) -> None:
+        if sys.byteorder != "little":
+            values.byteswap()
+        values.tofile(self._offsets_file)
+
+    def add_many(self, ids: array, names: Optional[List[str]] = None) -> None:
+        """Append a batch; ``ids`` must be a uint64 array continuing the sorted order"""
+        if not ids:
+            return
+        if ids[0] <= self._last:
+            raise ValueError(f"IDs must be added in increasing order ({ids[0]} after {self._last})")
+        self._last = ids[-1]
+        self.count += len(ids)
+        if sys.byteorder != "little":
+            ids = array("Q", ids)
+            ids.byteswap()
+        ids.tofile(self._file)
+        if not self.with_names:
+            return
+        names = names or [""] * len(ids)
+        text = "".join(names)
+        if text.isascii():
+            blob, lengths = text.encode("ascii"), map(len, names)
+        else:
+            encoded = [name.encode("utf-8") for name in names]
+            blob, lengths = b"".join(encoded), map(len, encoded)
+        if self.names_size + len(blob) >= 1 << 32:
+            raise CompiledBanlistError("Name table is larger than 4 GiB")
+        offsets = array("I", accumulate(lengths, initial=self.names_size))
+        self.names_size = offsets[-1]
+        self._write_u32(offsets[1:])
+        self._blob_file.write(blob)
+
+    def add(self, user_id: int, name: str = "") -> None:
+        self.add_many(array("Q", [user_id]), [name])
+
+    def close(self) -> int:
+        """Finish the file and rename it into place. Returns its size."""
+        flags = 0
+        names_offset = HEADER.size + self.count * 8
+        names_size = 0
+        if self.with_names and self.names_size:
+            flags |= FLAG_HAS_NAMES
+            for side in self._side_files:
+                side.seek(0)
+                shutil.copyfileobj(side, self._file, 1 << 20)
+            names_size = (self.count + 1) * 4 + self.names_size
+        self._discard_side_files()
+        self._file.seek(0)
+        self._file.write(HEADER.pack(MAGIC, FORMAT_VERSION, flags, self.count, names_offset, names_size))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(f"{self.path}.tmp", self.path)
+        return names_offset + names_size
+
+    def abort(self) -> None:
+        """Discard everything written so far"""
+        self._discard_side_files()
+        self._file.close()
+        try:
+            os.unlink(self._file.name)
+        except FileNotFoundError:
+            pass
+
+    def _discard_side_files(self) -> None:
+        for side in self._side_files:
+            side.close()
+            try:
+                os.unlink(side.name)
+            except FileNotFoundError:
+                pass
+        self._side_files = []
+
+
+def write(path: str, entries: Iterable[Tuple[int, str]], with_names: bool = True) -> int:
+    """Compile ``entries`` to ``path`` via a temp file and atomic rename"""
+    data = build(entries, with_names)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(data)
@@ -1,7 +1,5 @@
-import json
-import os
-from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from utils.settings import SettingsStore, get_settings
 
 DEFAULT_CONFIG = {
     "keyword_ban_behavior": "auto",  # auto, notify, ignore
@@ -12,30 +10,21 @@ DEFAULT_CONFIG = {
 }
 
 class ConfigManager:
-    def __init__(self):
-        self.root_dir = Path(__file__).parent.parent
-        self.CONFIG_FILE = self.root_dir / "guild_configs.json"
+    def __init__(self, store: Optional[SettingsStore] = None):
+        self.store = store or get_settings()
         self.configs = self._load_configs()
 
     def _load_configs(self) -> Dict[str, Dict[str, Any]]:
-        """Load configs from file or create new if missing"""
+        """Get the shared guild configs from the settings store, filling in defaults"""
+        loaded_configs = self.store.section("guild_configs")
         try:
-            if self.CONFIG_FILE.exists():
-                with open(self.CONFIG_FILE, 'r') as f:
-                    loaded_configs = json.load(f)
-                    for guild_id in list(loaded_configs.keys()):
-                        self._validate_guild_config(loaded_configs, guild_id)
-                    return loaded_configs
-            else:
-                print(f"Creating new config file at {self.CONFIG_FILE}")
-                empty_config = {}
-                self._save_configs(empty_config)  # Pass empty dict
-                return empty_config
-        except (json.JSONDecodeError, TypeError, KeyError) as e:
+            for guild_id in list(loaded_configs.keys()):
+                self._validate_guild_config(loaded_configs, guild_id)
+        except (TypeError, KeyError, AttributeError) as e:
             print(f"Error loading config file: {e}. Creating new config.")
-            empty_config = {}
-            self._save_configs(empty_config)  # Pass empty dict
-            return empty_config
+            loaded_configs.clear()
+            self._save_configs(loaded_configs)
+        return loaded_configs
 
     def _validate_guild_config(self, configs: Dict[str, Dict[str, Any]], guild_id: str) -> None:
         """Ensure all default settings exist in guild config"""
@@ -53,15 +42,9 @@ class ConfigManager:
                 del configs[guild_id][k]
 
     def _save_configs(self, configs: Dict[str, Dict[str, Any]]) -> None:
-        """Save configs to file with error handling"""
-        try:
-            self.CONFIG_FILE.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.CONFIG_FILE, 'w') as f:
-                json.dump(configs, f, indent=2)
-            self.configs = configs
-        except (IOError, OSError) as e:
-            print(f"Error saving config file: {e}")
-            raise
+        """Queue configs to be written by the settings store"""
+        self.store.replace("guild_configs", configs)
+        self.configs = self.store.section("guild_configs")
 
     def get_guild_config(self, guild_id: str) -> Dict[str, Any]:
         """Get guild config, creating default if needed"""
@@ -94,5 +77,5 @@ class ConfigManager:
         # Update config
         self._validate_guild_config(self.configs, guild_id)
         self.configs[guild_id][setting] = value
-        self._save_configs(self.configs)
+        self.store.mark_dirty("guild_configs", guild_id)
         return True
\ No newline at end of file
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional, Set
+from utils.filelock import file_lock
+
+TRIGGERS = ("id", "keyword", "notify", "failure")
+BAN_TRIGGERS = ("id", "keyword")
+
+
+class BanCounters:
+    """In-memory ban counters broken down by guild and trigger.
+
+    Incrementing is a dict update on the event loop, so concurrent bans
+    can't lose counts and nothing touches the disk. The counters are
+    written to ``ban_counts.json`` (and the running total to the legacy
+    ``ban_count.txt``) every ``flush_interval`` seconds and at shutdown.
+
+    Shard processes share the files: a flush re-reads them under a lock,
+    replaces only the guilds counted here and takes in everyone else's.
+    """
+
+    def __init__(self, root_dir: Optional[Path] = None, flush_interval: float = 60.0):
+        self.root_dir = Path(root_dir or Path(__file__).parent.parent)
+        self.path = self.root_dir / "ban_counts.json"
+        self.legacy_path = self.root_dir / "ban_count.txt"
+        self.flush_interval = flush_interval
+        self.guilds: Dict[str, Dict[str, int]] = {}
+        # Bans counted by ban_count.txt before per-guild counters existed
+        self.legacy_total = 0
+        # Guilds counted since the last flush
+        self._touched: Set[str] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._load()
+
+    def _read(self) -> Optional[dict]:
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            return {
+                "legacy_total": int(data.get("legacy_total", 0)),
+                "guilds": {str(g): dict(c) for g, c in data.get("guilds", {}).items()},
+            }
+        except FileNotFoundError:
+            pass
+        except (json.JSONDecodeError, ValueError, AttributeError, OSError) as e:
+            print(f"Error loading {self.path}: {e}")
+        return None
+
+    def _load(self) -> None:
+        data = self._read()
+        if data is not None:
+            self.guilds = data["guilds"]
+            self.legacy_total = data["legacy_total"]
+            return
+        try:
+            with open(self.legacy_path, 'r') as f:
+                self.legacy_total = int(f.read().strip() or "0")
+        except (FileNotFoundError, ValueError):
+            self.legacy_total = 0
+
+    def increment(self, guild_id, trigger: str, amount: int = 1) -> None:
+        counts = self.guilds.setdefault(str(guild_id), {})
+        counts[trigger] = counts.get(trigger, 0) + amount
+        self._touched.add(str(guild_id))
+
+    def guild_counts(self, guild_id) -> Dict[str, int]:
+        counts = self.guilds.get(str(guild_id), {})
+        return {trigger: counts.get(trigger, 0) for trigger in TRIGGERS}
+
+    def totals(self) -> Dict[str, int]:
+        totals = {trigger: 0 for trigger in TRIGGERS}
+        for counts in self.guilds.values():
+            for trigger, count in counts.items():
+                totals[trigger] = totals.get(trigger, 0) + count
+        return totals
+
+    @property
+    def total_bans(self) -> int:
+        totals = self.totals()
+        return self.legacy_total + sum(totals[t] for t in BAN_TRIGGERS)
+
+    @staticmethod
+    def _write_atomic(path: Path, payload: str) -> None:
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, 'w') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _changes(self) -> Dict[str, Dict[str, int]]:
+        """Snapshot the touched guilds' counts on the calling (loop) thread"""
+        touched, self._touched = self._touched, set()
+        return {guild_id: dict(self.guilds[guild_id]) for guild_id in touched}
+
+    def _write(self, changes: Dict[str, Dict[str, int]]) -> Dict[str, Dict[str, int]]:
+        """Merge the changes into the files under the file lock (blocking). Returns every guild's counts."""
+        with file_lock(self.path):
+            data = self._read() or {"legacy_total": self.legacy_total, "guilds": {}}
+            data["guilds"].update(changes)
+            bans = sum(counts.get(t, 0) for counts in data["guilds"].values() for t in BAN_TRIGGERS)
+            payloads = [(self.path, json.dumps(data)), (self.legacy_path, str(data["legacy_total"] + bans))]
+            for path, payload in payloads:
+                try:
+                    self._write_atomic(path, payload)
+                except OSError as e:
+                    print(f"Error saving {path}: {e}")
+        return data["guilds"]
+
+    def _adopt(self, guilds: Dict[str, Dict[str, int]]) -> None:
+        """Take in the other processes' counts, except guilds counted here since the flush"""
+        for guild_id, counts in guilds.items():
+            if guild_id not in self._touched:
+                self.guilds[guild_id] = counts
+
+    async def flush(self) -> None:
+        """Persist the counters in a worker thread if they changed"""
+        if not self._touched:
+            return
+        self._adopt(await asyncio.to_thread(self._write, self._changes()))
+
+    def flush_sync(self) -> None:
+        if self._touched:
+            self._adopt(self._write(self._changes()))
+
+    def start_flushing(self) -> None:
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
@@ -0,0 +1,75 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+from utils.metrics import DECISION_CACHE_LOOKUPS
+
+# (trigger, keyword): ("id", None), ("keyword", "<keyword>") or CLEAN
+Verdict = Tuple[Optional[str], Optional[str]]
+CLEAN: Verdict = (None, None)
+
+
+def fields_key(fields: Dict[str, Optional[str]]) -> int:
+    """Hash of the profile fields a verdict was based on"""
+    return hash(tuple(sorted(fields.items())))
+
+
+class DecisionCache:
+    """Screening verdicts per user, shared by every guild.
+
+    Entries are keyed by user ID plus a hash of the profile fields, so a
+    rename or a different per-guild nickname is a miss. Entries expire after
+    ``ttl`` seconds and the least recently used are evicted past
+    ``maxsize``. The whole cache is dropped whenever the generation (banlist
+    generation and keyword set) passed to :meth:`validate` changes.
+    """
+
+    def __init__(self, maxsize: int = 100_000, ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[int, int], Tuple[float, Verdict]]" = OrderedDict()
+        self.generation: Optional[Hashable] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def validate(self, generation: Hashable) -> None:
+        """Drop every verdict if the banlist or keywords changed since they were cached"""
+        if generation != self.generation:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.generation = generation
+
+    def get(self, user_id: int, key: int) -> Optional[Verdict]:
+        """Cached verdict, or None on a miss"""
+        entry = self._entries.get((user_id, key))
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end((user_id, key))
+                self.hits += 1
+                DECISION_CACHE_LOOKUPS.labels("hit").inc()
+                return entry[1]
+            del self._entries[(user_id, key)]
+        self.misses += 1
+        DECISION_CACHE_LOOKUPS.labels("miss").inc()
+        return None
+
+    def put(self, user_id: int, key: int, verdict: Verdict) -> None:
+        self._entries[(user_id, key)] = (time.monotonic() + self.ttl, verdict)
+        self._entries.move_to_end((user_id, key))
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,222 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Tuple
+
+import discord
+
+from utils.metrics import DM_MESSAGES, DM_QUEUE_DEPTH, REST_LATENCY
+
+# HTTP statuses worth trying again; anything else (DMs closed, no mutual guild) won't change
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Discord's message length limit
+MAX_CONTENT = 2000
+
+
+class _PendingDM:
+    __slots__ = ("user", "contents", "attempts")
+
+    def __init__(self, user, contents: List[str]):
+        self.user = user
+        self.contents = contents
+        self.attempts = 0
+
+
+class DMQueue:
+    """Background delivery of ban DMs, one entry per user.
+
+    :meth:`put` returns straight away; ``concurrency`` workers send the
+    DMs. DMs queued for a user who already has one waiting are merged into
+    it, so a user banned from several guilds at once gets a single DM, and
+    text the user was sent in the last ``dedupe_ttl`` seconds isn't sent
+    again. Failed sends that may succeed later (429s, 5xx, connection
+    errors) are retried up to ``max_attempts`` times, ``backoff`` seconds
+    apart and doubling, without holding a worker while they wait. When
+    ``maxsize`` users are waiting, new DMs are dropped.
+    """
+
+    def __init__(self, maxsize: int = 10000, concurrency: int = 2, max_attempts: int = 4,
+                 backoff: float = 2.0, dedupe_ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.concurrency = max(1, concurrency)
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self.dedupe_ttl = dedupe_ttl
+        # user ID -> DM waiting to be sent, in queue order
+        self._pending: Dict[int, _PendingDM] = {}
+        self._order: Deque[int] = deque()
+        # (user ID, text) -> when it was delivered, oldest first
+        self._delivered: "OrderedDict[Tuple[int, str], float]" = OrderedDict()
+        # user ID -> (timer, DM) waiting out a backoff
+        self._retries: Dict[int, Tuple[asyncio.TimerHandle, _PendingDM]] = {}
+        self._not_empty = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._busy = 0
+        self._tasks: List[asyncio.Task] = []
+        self.delivered = 0
+        self.failed = 0
+        self.dropped = 0
+        self.deduplicated = 0
+        self.retried = 0
+        DM_QUEUE_DEPTH.set_function(lambda: len(self._pending) + len(self._retries))
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Give the workers ``timeout`` seconds to send what's queued, then cancel them"""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            print(f"DM queue: stopped with {len(self._pending) + len(self._retries)} DMs unsent")
+        for handle, _ in self._retries.values():
+            handle.cancel()
+        self._retries.clear()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def join(self) -> None:
+        """Wait until every queued DM, including pending retries, has been sent or given up on"""
+        while self._pending or self._busy or self._retries:
+            self._idle.clear()
+            await self._idle.wait()
+
+    def put(self, user, content: str) -> bool:
+        """Queue ``content`` for ``user`` without blocking. Returns False if the DM was dropped."""
+        if self._recently_delivered(user.id, content):
+            self._count("deduplicated")
+            return True
+        entry = self._pending.get(user.id)
+        if entry is not None:
+            if content in entry.contents:
+                self._count("deduplicated")
+            else:
+                entry.contents.append(content)
+            return True
+        if len(self._pending) >= self.maxsize:
+            self._count("dropped")
+            return False
+        self._pending[user.id] = _PendingDM(user, [content])
+        self._order.append(user.id)
+        self._not_empty.set()
+        return True
+
+    def _count(self, outcome: str) -> None:
+        setattr(self, outcome, getattr(self, outcome) + 1)
+        DM_MESSAGES.labels(outcome).inc()
+
+    def _recently_delivered(self, user_id: int, content: str) -> bool:
+        cutoff = time.monotonic() - self.dedupe_ttl
+        while self._delivered and next(iter(self._delivered.values())) < cutoff:
+            self._delivered.popitem(last=False)
+        return (user_id, content) in self._delivered
+
+    def _remember(self, user_id: int, contents: List[str]) -> None:
+        now = time.monotonic()
+        for content in contents:
+            self._delivered[(user_id, content)] = now
+            self._delivered.move_to_end((user_id, content))
+        # Bounded like the queue, forgetting the oldest deliveries first
+        while len(self._delivered) > self.maxsize:
+            self._delivered.popitem(last=False)
+
+    async def _next(self) -> _PendingDM:
+        while not self._order:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        return self._pending.pop(self._order.popleft())
+
+    async def _worker(self) -> None:
+        while True:
+            entry = await self._next()
+            self._busy += 1
+            try:
+                await self._deliver(entry)
+            except Exception as e:
+                self._count("failed")
+                print(f"DM queue: could not DM {entry.user.id}: {e}")
+            finally:
+                self._busy -= 1
+                self._check_idle()
+
+    def _check_idle(self) -> None:
+        if not self._pending and not self._busy and not self._retries:
+            self._idle.set()
+
+    @staticmethod
+    def _messages(contents: List[str]) -> List[List[str]]:
+        """Group the texts into as few DMs as fit Discord's length limit"""
+        groups: List[List[str]] = []
+        length = 0
+        for content in contents:
+            if not groups or length + len(content) + 2 > MAX_CONTENT:
+                groups.append([])
+                length = -2
+            groups[-1].append(content)
+            length += len(content) + 2
+        return groups
+
+    async def _deliver(self, entry: _PendingDM) -> None:
+        entry.attempts += 1
+        for group in self._messages(entry.contents):
+            try:
+                with REST_LATENCY.labels("dm").time():
+                    await entry.user.send("\n\n".join(group)[:MAX_CONTENT])
+            except (discord.HTTPException, OSError, asyncio.TimeoutError) as e:
+                # Only what's left is retried, so nothing already sent is repeated
+                entry.contents = entry.contents[entry.contents.index(group[0]):]
+                # OSError and timeouts are connection trouble, also worth another go
+                retryable = getattr(e, "status", None) in RETRY_STATUSES or not isinstance(e, discord.HTTPException)
+                if retryable and entry.attempts < self.max_attempts:
+                    self._schedule_retry(entry, self.backoff * 2 ** (entry.attempts - 1))
+                else:
+                    self._count("failed")
+                return
+            self._remember(entry.user.id, group)
+        self._count("delivered")
+
+    def _schedule_retry(self, entry: _PendingDM, delay: float) -> None:
+        self._count("retried")
+        scheduled = self._retries.get(entry.user.id)
+        if scheduled is not None:
+            # Already waiting to retry an earlier DM; this goes along with it
+            scheduled[1].contents.extend(c for c in entry.contents if c not in scheduled[1].contents)
+            return
+        handle = asyncio.get_running_loop().call_later(delay, self._requeue, entry)
+        self._retries[entry.user.id] = (handle, entry)
+
+    def _requeue(self, entry: _PendingDM) -> None:
+        del self._retries[entry.user.id]
+        newer = self._pending.get(entry.user.id)
+        if newer is not None:
+            # More DMs were queued for them in the meantime; send it all together
+            newer.contents[:0] = [content for content in entry.contents if content not in newer.contents]
+            newer.attempts = entry.attempts
+        else:
+            self._pending[entry.user.id] = entry
+            self._order.append(entry.user.id)
+            self._not_empty.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": len(self._pending),
+            "maxsize": self.maxsize,
+            "in_progress": self._busy,
+            "retrying": len(self._retries),
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "deduplicated": self.deduplicated,
+            "retried": self.retried,
+        }
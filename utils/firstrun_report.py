@@ -0,0 +1,200 @@
+import csv
+import io
+import tempfile
+import time
+from typing import List, Optional
+
+import discord
+
+# Discord embed limits
+FIELD_VALUE_LIMIT = 1024
+FIELDS_PER_EMBED = 6
+EMBEDS_PER_MESSAGE = 10
+MESSAGE_TOTAL_LIMIT = 6000  # characters across every embed in one message
+# Interaction tokens (and so followups and their edits) expire after 15 minutes;
+# switch to a channel message a minute before that
+TOKEN_LIFETIME = 14 * 60
+
+
+class FirstrunReport:
+    """Tracks a firstrun scan and reports it with O(1) messages.
+
+    Progress goes into one message that is edited at most every
+    ``interval`` seconds. Every match is streamed into a CSV attachment as
+    it happens, and the final summary is a set of paginated embeds.
+
+    Both go through the interaction's followup webhook until its token is
+    about to expire. Long (or resumed) scans then carry on in the fallback
+    channel given to :meth:`start`, usually the guild's log channel.
+    """
+
+    CSV_COLUMNS = ["user_id", "name", "trigger", "keyword", "status"]
+
+    def __init__(self, total: int, interval: float = 5.0):
+        self.total = total
+        self.interval = interval
+        self.checked = 0
+        self.matched = 0
+        self.banned = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self.ban_phase_started: Optional[float] = None
+        self.message: Optional[discord.Message] = None
+        self.channel: Optional[discord.abc.Messageable] = None
+        self._token_expires = 0.0
+        self._last_edit = 0.0
+        self._lines: List[str] = []
+        self._file = tempfile.SpooledTemporaryFile(max_size=1024 * 1024, mode="w+b")
+        self._text = io.TextIOWrapper(self._file, encoding="utf-8", newline="", write_through=True)
+        self._csv = csv.writer(self._text)
+        self._csv.writerow(self.CSV_COLUMNS)
+
+    def record(self, member, trigger: str, status: str, keyword: str = None) -> None:
+        """Record the outcome for one matched member"""
+        if status == "banned":
+            self.banned += 1
+        elif status == "failed":
+            self.failed += 1
+        self._csv.writerow([member.id, str(member), trigger, keyword or "", status])
+        detail = f" `{keyword}`" if keyword else ""
+        self._lines.append(f"{member} ({member.id}) - {trigger}{detail}: {status}")
+
+    def _eta(self) -> str:
+        now = time.monotonic()
+        if self.ban_phase_started is None:
+            elapsed, done, remaining = now - self.started, self.checked, self.total - self.checked
+        else:
+            done = self.banned + self.failed
+            elapsed, remaining = now - self.ban_phase_started, self.matched - done
+        if done == 0 or remaining <= 0:
+            return "-"
+        return f"{int(remaining * elapsed / done)}s"
+
+    def progress_text(self) -> str:
+        return (
+            f"⏳ Firstrun in progress\n"
+            f"Checked: {self.checked}/{self.total} | Matched: {self.matched} | "
+            f"Banned: {self.banned} | Failed: {self.failed} | ETA: {self._eta()}"
+        )
+
+    async def start(self, interaction: discord.Interaction,
+                    fallback: Optional[discord.abc.Messageable] = None) -> None:
+        """Send the progress message; ``fallback`` takes over once the interaction expires"""
+        self._token_expires = interaction.created_at.timestamp() + TOKEN_LIFETIME
+        self.channel = fallback or interaction.channel
+        self.message = await interaction.followup.send(self.progress_text(), ephemeral=True, wait=True)
+        self._last_edit = time.monotonic()
+
+    def _token_expired(self) -> bool:
+        return time.time() >= self._token_expires
+
+    async def _move_to_channel(self) -> None:
+        """Continue the progress message in the fallback channel"""
+        try:
+            message = await self.channel.send(self.progress_text())
+        except discord.HTTPException:
+            return  # Try again on the next update
+        if self.message is not None:
+            try:
+                await self.message.edit(content=f"⏳ Firstrun still running; progress continues in {message.jump_url}")
+            except discord.HTTPException:
+                pass
+        self.message = message
+
+    async def update(self, force: bool = False) -> None:
+        """Edit the progress message if the throttle interval has passed"""
+        now = time.monotonic()
+        if self.message is None or (not force and now - self._last_edit < self.interval):
+            return
+        self._last_edit = now
+        if isinstance(self.message, discord.WebhookMessage) and self.channel is not None and self._token_expired():
+            await self._move_to_channel()
+            return
+        try:
+            await self.message.edit(content=self.progress_text())
+        except discord.HTTPException:
+            pass  # Progress is best effort; the final report still goes out
+
+    def _pages(self) -> List[str]:
+        pages, current = [], ""
+        for line in self._lines:
+            line = line[:FIELD_VALUE_LIMIT]
+            if len(current) + len(line) + 1 > FIELD_VALUE_LIMIT:
+                pages.append(current)
+                current = ""
+            current = f"{current}\n{line}" if current else line
+        if current:
+            pages.append(current)
+        return pages
+
+    def build_embeds(self, ids_in_list: int) -> List[discord.Embed]:
+        """Summary embed followed by as many match pages as fit in one message"""
+        summary = discord.Embed(
+            title="Firstrun Summary",
+            description="Ban operation summary",
+            color=discord.Color.red()
+        )
+        summary.add_field(name="Users Checked", value=str(self.checked), inline=False)
+        summary.add_field(name="IDs in List", value=str(ids_in_list), inline=False)
+        summary.add_field(name="Matches Found", value=str(self.matched), inline=False)
+        summary.add_field(name="Banned", value=str(self.banned), inline=True)
+        summary.add_field(name="Failed", value=str(self.failed), inline=True)
+        summary.add_field(name="Duration", value=f"{int(time.monotonic() - self.started)}s", inline=True)
+
+        embeds = [summary]
+        pages = self._pages()
+        budget = MESSAGE_TOTAL_LIMIT - len(summary) - 200  # room for page headers and footer
+        shown = 0
+        embed = None
+        for i, page in enumerate(pages, start=1):
+            if len(page) > budget:
+                break
+            if embed is None or len(embed.fields) >= FIELDS_PER_EMBED:
+                if len(embeds) >= EMBEDS_PER_MESSAGE:
+                    break
+                embed = discord.Embed(title="Matched Users", color=discord.Color.red())
+                embeds.append(embed)
+            embed.add_field(name=f"Page {i}/{len(pages)}", value=page, inline=False)
+            budget -= len(page)
+            shown += 1
+        if shown < len(pages):
+            embeds[-1].set_footer(text="Showing the first matches only; see the attached CSV for all of them")
+        elif not pages:
+            summary.add_field(name="Matched Users", value="None", inline=False)
+        return embeds
+
+    def attachment(self, guild_id: str) -> Optional[discord.File]:
+        """CSV of every match, or None when nothing matched"""
+        if not self._lines:
+            return None
+        self._text.flush()
+        self._file.seek(0)
+        return discord.File(self._file, filename=f"firstrun_{guild_id}.csv")
+
+    async def finish(self, interaction: discord.Interaction, guild_id: str, ids_in_list: int) -> None:
+        """Replace the progress message with the final report"""
+        expired = self._token_expired()
+        if self.message is not None and not (expired and isinstance(self.message, discord.WebhookMessage)):
+            try:
+                await self.message.edit(content="✅ Firstrun complete")
+            except discord.HTTPException:
+                pass
+        file = self.attachment(guild_id)
+        # Hand the buffer to discord.File without the text wrapper closing it underneath
+        self._text.detach()
+        kwargs = {"file": file} if file else {}
+        embeds = self.build_embeds(ids_in_list)
+        try:
+            if not expired or self.channel is None:
+                try:
+                    await interaction.followup.send(embeds=embeds, ephemeral=True, **kwargs)
+                    return
+                except discord.HTTPException:
+                    if self.channel is None:
+                        raise
+                    # The token ran out while sending; the report goes to the channel instead
+                    if file:
+                        file.reset()
+            await self.channel.send(embeds=embeds, **kwargs)
+        finally:
+            self._file.close()
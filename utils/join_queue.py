@@ -0,0 +1,249 @@
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from utils.metrics import JOIN_LATENCY, JOIN_QUEUE_DEPTH, JOIN_QUEUE_OVERFLOW, JOIN_BATCH_SIZE
+
+POLICIES = ("spill", "drop_oldest", "drop_newest")
+
+# (member, perf_counter timestamp when it was queued)
+QueuedJoin = Tuple[Any, float]
+
+
+class JoinQueue:
+    """Bounded queue of member joins drained in micro-batches by a worker pool.
+
+    ``on_member_join`` only has to call :meth:`put`. Workers take up to
+    ``batch_size`` members at a time, waiting at most ``batch_wait`` seconds
+    for a batch to fill, and hand the whole batch to the processing
+    callback. When the queue is full, ``policy`` decides what gives:
+
+    - ``spill``: append the member's guild and ID to ``spill_path`` (in
+      batches, from a background task) and queue them again once the
+      backlog has halved
+    - ``drop_oldest``: discard the longest-waiting member
+    - ``drop_newest``: discard the member that just joined
+    """
+
+    def __init__(self, maxsize: int = 5000, workers: int = 2, batch_size: int = 50,
+                 batch_wait: float = 0.05, policy: str = "spill", spill_path: Optional[str] = None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown join queue policy {policy!r}, expected one of {', '.join(POLICIES)}")
+        self.maxsize = maxsize
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait
+        self.policy = policy
+        self.spill_path = Path(spill_path or Path(__file__).parent.parent / "join_spill.jsonl")
+        self._items: Deque[QueuedJoin] = deque()
+        self._not_empty = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._busy = 0
+        self._tasks: List[asyncio.Task] = []
+        self._refill_lock = asyncio.Lock()
+        # Spilled joins waiting to be appended to the spill file
+        self._spill_buffer: List[Dict[str, int]] = []
+        self._spill_task: Optional[asyncio.Task] = None
+        self._spill_lock = asyncio.Lock()
+        self._process: Optional[Callable[[List[Any]], Awaitable[None]]] = None
+        self._resolve: Optional[Callable[[int, int], Awaitable[Any]]] = None
+        self.processed = 0
+        self.batches = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.pending_spill = self._count_spilled()
+        JOIN_QUEUE_DEPTH.set_function(lambda: len(self._items))
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _count_spilled(self) -> int:
+        try:
+            with open(self.spill_path, 'r', encoding='utf-8') as f:
+                return sum(1 for line in f if line.strip())
+        except FileNotFoundError:
+            return 0
+
+    def start(self, process: Callable[[List[Any]], Awaitable[None]],
+              resolve: Optional[Callable[[int, int], Awaitable[Any]]] = None) -> None:
+        """Start the workers.
+
+        ``process`` receives each batch of members. ``resolve(guild_id,
+        member_id)`` turns a spilled entry back into a member, or returns
+        None if they're gone; spilled entries are only replayed when it's set.
+        """
+        if self._tasks:
+            return
+        self._process = process
+        self._resolve = resolve
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if self.pending_spill:
+            print(f"Join queue: {self.pending_spill} spilled joins from a previous run will be replayed")
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Give the workers ``timeout`` seconds to drain the queue, then cancel them"""
+        if self._tasks:
+            try:
+                await asyncio.wait_for(self.join(), timeout=timeout)
+            except asyncio.TimeoutError:
+                print(f"Join queue: stopped with {len(self._items)} joins unprocessed")
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks = []
+        # Whatever is still buffered has to reach the file to be replayed next run
+        await self._flush_spill()
+
+    async def join(self) -> None:
+        """Wait until every queued join has been processed"""
+        while self._items or self._busy:
+            self._idle.clear()
+            await self._idle.wait()
+
+    def put(self, member) -> bool:
+        """Queue a member without blocking. Returns False if the overflow policy turned them away."""
+        if len(self._items) >= self.maxsize:
+            if self.policy == "drop_newest":
+                self._overflow("dropped")
+                return False
+            if self.policy == "drop_oldest":
+                self._items.popleft()
+                self._overflow("dropped")
+            else:
+                self._spill(member)
+                return False
+        self._items.append((member, time.perf_counter()))
+        self._not_empty.set()
+        return True
+
+    def _overflow(self, outcome: str, count: int = 1) -> None:
+        JOIN_QUEUE_OVERFLOW.labels(outcome).inc(count)
+        if outcome == "dropped":
+            self.dropped += count
+        else:
+            self.spilled += count
+
+    def _spill(self, member) -> None:
+        # put() runs in the gateway dispatch path; the file is written from a task
+        self._spill_buffer.append({"guild_id": member.guild.id, "member_id": member.id})
+        if self._spill_task is None or self._spill_task.done():
+            self._spill_task = asyncio.create_task(self._flush_spill())
+
+    async def _flush_spill(self) -> None:
+        """Append the buffered spilled joins to the spill file in a worker thread"""
+        async with self._spill_lock:
+            # Joins spilled while a write is running go out together in the next one
+            while self._spill_buffer:
+                entries, self._spill_buffer = self._spill_buffer, []
+                try:
+                    await asyncio.to_thread(self._write_spilled, entries)
+                except OSError as e:
+                    print(f"Join queue: could not spill {len(entries)} members: {e}")
+                    self._overflow("dropped", len(entries))
+                    continue
+                self.pending_spill += len(entries)
+                self._overflow("spilled", len(entries))
+
+    def _write_spilled(self, entries: List[Dict[str, int]]) -> None:
+        with open(self.spill_path, 'a', encoding='utf-8') as f:
+            f.writelines(json.dumps(entry) + "\n" for entry in entries)
+
+    def _take_spilled(self) -> List[Dict[str, int]]:
+        """Read and remove the spill file (blocking)"""
+        tmp_path = self.spill_path.with_name(self.spill_path.name + ".replay")
+        try:
+            os.replace(self.spill_path, tmp_path)
+        except FileNotFoundError:
+            return []
+        entries = []
+        with open(tmp_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        os.remove(tmp_path)
+        return entries
+
+    async def _refill(self) -> None:
+        """Requeue spilled joins once the backlog has room for them"""
+        if self._resolve is None or self._refill_lock.locked():
+            return
+        async with self._refill_lock:
+            async with self._spill_lock:
+                entries = await asyncio.to_thread(self._take_spilled)
+            self.pending_spill = max(0, self.pending_spill - len(entries))
+            for i, entry in enumerate(entries):
+                if len(self._items) >= self.maxsize:
+                    # Still backed up; leave the rest for the next refill
+                    async with self._spill_lock:
+                        await asyncio.to_thread(self._write_spilled, entries[i:])
+                    self.pending_spill += len(entries) - i
+                    return
+                try:
+                    member = await self._resolve(int(entry["guild_id"]), int(entry["member_id"]))
+                except Exception as e:
+                    print(f"Join queue: could not resolve spilled member {entry.get('member_id')}: {e}")
+                    continue
+                if member is not None:
+                    self.put(member)
+
+    async def _next_batch(self) -> List[QueuedJoin]:
+        while not self._items:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        batch = [self._items.popleft()]
+        deadline = time.perf_counter() + self.batch_wait
+        while len(batch) < self.batch_size:
+            if self._items:
+                batch.append(self._items.popleft())
+                continue
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            self._not_empty.clear()
+            try:
+                await asyncio.wait_for(self._not_empty.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _worker(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            self._busy += 1
+            try:
+                JOIN_BATCH_SIZE.observe(len(batch))
+                await self._process([member for member, _ in batch])
+            except Exception as e:
+                print(f"Join queue: batch of {len(batch)} failed: {e}")
+            finally:
+                self._busy -= 1
+                now = time.perf_counter()
+                for _, queued_at in batch:
+                    JOIN_LATENCY.observe(now - queued_at)
+                self.processed += len(batch)
+                self.batches += 1
+                if not self._items and not self._busy:
+                    self._idle.set()
+            if self.pending_spill and len(self._items) < self.maxsize // 2:
+                await self._refill()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "depth": len(self._items),
+            "maxsize": self.maxsize,
+            "in_progress": self._busy,
+            "workers": len(self._tasks),
+            "policy": self.policy,
+            "processed": self.processed,
+            "batches": self.batches,
+            "avg_batch": round(self.processed / self.batches, 1) if self.batches else 0,
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+            "pending_spill": self.pending_spill,
+        }
@@ -0,0 +1,159 @@
+import unicodedata
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# Look-alike letters from other scripts, folded onto the ASCII letter they imitate.
+# Applied after NFKC + casefold, so only lowercase forms are needed here.
+CONFUSABLES = {
+    # Cyrillic
+    "а": "a", "в": "b", "е": "e", "ё": "e", "к": "k", "м": "m", "н": "h", "о": "o",
+    "р": "p", "с": "c", "т": "t", "у": "y", "х": "x", "ѕ": "s", "і": "i", "ї": "i",
+    "ј": "j", "ԁ": "d", "ԛ": "q", "ԝ": "w", "һ": "h", "ɡ": "g",
+    # Greek
+    "α": "a", "β": "b", "ε": "e", "η": "n", "ι": "i", "κ": "k", "ν": "v", "ο": "o",
+    "ρ": "p", "σ": "s", "ς": "s", "τ": "t", "υ": "u", "χ": "x", "ω": "w",
+    # Latin look-alikes NFKC leaves alone
+    "ı": "i", "ȷ": "j", "ł": "l", "ø": "o", "đ": "d", "ħ": "h", "ŧ": "t",
+}
+
+LEETSPEAK = {
+    "0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "8": "b", "9": "g",
+    "@": "a", "$": "s", "!": "i", "|": "l", "+": "t",
+}
+
+# Invisible characters are always removed. Punctuation used to split a word up
+# ("s.p.a.w.n", "spa_wn") is removed too. Whitespace is only removed when asked,
+# since joining words turns innocent names like "this pawn" into matches.
+INVISIBLE = {"\u200b", "\u200c", "\u200d", "\u2060", "\ufeff", "\u00ad", "\u180e"}
+SEPARATORS = set(".,_-~*'\"`^:;/\\()[]{}<>=#%&?")
+
+
+class KeywordHit(NamedTuple):
+    keyword: str
+    field: str
+    offset: int  # index into the original (un-normalized) field text
+
+
+@lru_cache(maxsize=4096)
+def _normalize_char(char: str, strip_whitespace: bool) -> str:
+    """Map one input character to zero or more normalized characters"""
+    if char in INVISIBLE or unicodedata.category(char) in ("Cf", "Mn"):
+        return ""
+    if char.isspace():
+        return "" if strip_whitespace else " "
+    out = []
+    for c in unicodedata.normalize("NFKC", char).casefold():
+        c = CONFUSABLES.get(c, c)
+        c = LEETSPEAK.get(c, c)
+        if c in SEPARATORS or c in INVISIBLE or unicodedata.category(c) == "Mn":
+            continue
+        # Strip remaining accents, e.g. "š" -> "s"
+        base = unicodedata.normalize("NFD", c)[0]
+        out.append(base)
+    return "".join(out)
+
+
+def normalize(text: str, strip_whitespace: bool = False) -> Tuple[str, List[int]]:
+    """Normalize text for matching.
+
+    Returns the normalized string and, for every character in it, the index
+    of the original character it came from.
+    """
+    chars = []
+    origin = []
+    for i, char in enumerate(text):
+        mapped = _normalize_char(char, strip_whitespace)
+        for c in mapped:
+            chars.append(c)
+            origin.append(i)
+    return "".join(chars), origin
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over the normalized forms of a keyword list.
+
+    Scanning costs one transition per input character regardless of how
+    many keywords there are.
+    """
+
+    def __init__(self, keywords: Sequence[str], strip_whitespace: bool = False):
+        self.keywords = list(keywords)
+        self.strip_whitespace = strip_whitespace
+        self._rank = {keyword: i for i, keyword in reversed(list(enumerate(self.keywords)))}
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # (keyword index, normalized length) for every keyword ending at a node
+        self._out: List[List[Tuple[int, int]]] = [[]]
+        for index, keyword in enumerate(self.keywords):
+            pattern, _ = normalize(keyword, strip_whitespace)
+            if pattern:
+                self._add(pattern, index)
+        self._build_failure_links()
+
+    def _add(self, pattern: str, index: int) -> None:
+        node = 0
+        for c in pattern:
+            nxt = self._goto[node].get(c)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][c] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((index, len(pattern)))
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for c, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and c not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(c, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def match_fields(self, fields: Dict[str, Optional[str]]) -> List[KeywordHit]:
+        """Find every keyword occurrence across all fields in a single pass"""
+        goto, fail, out = self._goto, self._fail, self._out
+        hits = []
+        for field, text in fields.items():
+            if not text:
+                continue
+            normalized, origin = normalize(str(text), self.strip_whitespace)
+            node = 0
+            for pos, c in enumerate(normalized):
+                while node and c not in goto[node]:
+                    node = fail[node]
+                node = goto[node].get(c, 0)
+                for index, length in out[node]:
+                    hits.append(KeywordHit(self.keywords[index], field, origin[pos - length + 1]))
+        return hits
+
+    def best(self, hits: List[KeywordHit]) -> Optional[KeywordHit]:
+        """The hit to report: the earliest-listed keyword in the first field that matched.
+
+        That's what checking the fields in order with :meth:`first_match`
+        would give, so "Spawnist" is reported as "spawnist", not "spawn".
+        """
+        if not hits:
+            return None
+        field = hits[0].field
+        return min((hit for hit in hits if hit.field == field), key=lambda hit: self._rank[hit.keyword])
+
+    def first_match(self, text: Optional[str]) -> Optional[str]:
+        """Return the earliest-listed keyword found in ``text``, if any"""
+        hit = self.best(self.match_fields({"text": text}))
+        return hit.keyword if hit else None
+
+
+def member_fields(member) -> Dict[str, Optional[str]]:
+    """The profile fields keyword detection runs against"""
+    return {
+        "name": member.name,
+        "nick": getattr(member, "nick", None),
+        "global_name": getattr(member, "global_name", None),
+    }
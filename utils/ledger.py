@@ -0,0 +1,154 @@
+import asyncio
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bans (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    guild_id INTEGER NOT NULL,
+    trigger TEXT NOT NULL,
+    keyword TEXT,
+    status TEXT NOT NULL,
+    reason TEXT,
+    created_at REAL NOT NULL
+);
+-- Single-column indexes: SQLite keys each one by (column, rowid), so the
+-- equality filters below still return rows in id order for paging
+CREATE INDEX IF NOT EXISTS idx_bans_user ON bans (user_id);
+CREATE INDEX IF NOT EXISTS idx_bans_guild ON bans (guild_id);
+CREATE INDEX IF NOT EXISTS idx_bans_trigger ON bans (trigger);
+CREATE INDEX IF NOT EXISTS idx_bans_created ON bans (created_at);
+"""
+
+COLUMNS = ("id", "user_id", "guild_id", "trigger", "keyword", "status", "reason", "created_at")
+
+
+class BanLedger:
+    """Durable, queryable record of every ban decision the bot made.
+
+    Writes are queued and committed in batches by a background thread, so
+    recording a ban never touches the disk on the event loop. The database
+    runs in WAL mode so queries can run while the writer is committing.
+
+    With ``read_only`` the database must already exist; it is opened
+    read-only, nothing is created and no writer thread is started.
+    """
+
+    def __init__(self, path: Optional[Path] = None, batch_size: int = 200, flush_interval: float = 1.0,
+                 read_only: bool = False):
+        self.path = Path(path or Path(__file__).parent.parent / "ban_ledger.db")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.read_only = read_only
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        if read_only:
+            if not self.path.is_file():
+                raise FileNotFoundError(f"No ledger database at {self.path}")
+            return
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        self._writer = threading.Thread(target=self._write_loop, name="ban-ledger", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.read_only:
+            return sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True, timeout=30)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def record(self, user_id: int, guild_id: int, trigger: str, status: str,
+               reason: str = None, keyword: str = None) -> None:
+        """Queue one ban decision to be written"""
+        if self.read_only:
+            raise RuntimeError("Ledger was opened read-only")
+        self._queue.put((int(user_id), int(guild_id), trigger, keyword, status, reason, time.time()))
+
+    def _write_loop(self) -> None:
+        conn = self._connect()
+        stop = False
+        while not stop:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = []
+            while True:
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    with conn:
+                        conn.executemany(
+                            "INSERT INTO bans (user_id, guild_id, trigger, keyword, status, reason, created_at)"
+                            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            batch
+                        )
+                except sqlite3.Error as e:
+                    print(f"Error writing {len(batch)} ledger entries: {e}")
+        conn.close()
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Write everything still queued and stop the writer thread"""
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout)
+
+    @staticmethod
+    def _where(user_id=None, guild_id=None, trigger=None, since=None, until=None, before_id=None):
+        clauses, params = [], []
+        for column, value in (("user_id", user_id), ("guild_id", guild_id), ("trigger", trigger)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        if before_id is not None:
+            clauses.append("id < ?")
+            params.append(before_id)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def iter_query(self, limit: Optional[int] = None, **filters) -> Iterator[Dict[str, Any]]:
+        """Stream matching rows newest first without loading them all.
+
+        Filters: user_id, guild_id, trigger, since, until (unix timestamps)
+        and before_id, the keyset cursor for the next page.
+        """
+        where, params = self._where(**filters)
+        sql = f"SELECT {', '.join(COLUMNS)} FROM bans{where} ORDER BY id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        conn = self._connect()
+        try:
+            for row in conn.execute(sql, params):
+                yield dict(zip(COLUMNS, row))
+        finally:
+            conn.close()
+
+    def query(self, limit: int = 10, **filters) -> List[Dict[str, Any]]:
+        """One page of results; pass the last row's id as before_id for the next"""
+        return list(self.iter_query(limit=limit, **filters))
+
+    async def query_async(self, limit: int = 10, **filters) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.query, limit, **filters)
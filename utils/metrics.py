@@ -0,0 +1,250 @@
+import asyncio
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Latency buckets in seconds, from sub-millisecond CPU work up to slow REST calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{str(v)}"'.replace("\n", " ") for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        REGISTRY.register(self)
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _default(self):
+        return self.labels()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, key))
+        return lines
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+
+    def render(self, name, labelnames, key):
+        return [f"{name}{_format_labels(labelnames, key)} {self.value}"]
+
+
+class _CounterValue(_Value):
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class _GaugeValue(_Value):
+    def __init__(self):
+        super().__init__()
+        self.function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Compute the value on every scrape instead of storing it"""
+        self.function = function
+
+    def render(self, name, labelnames, key):
+        if self.function is not None:
+            try:
+                self.value = float(self.function())
+            except Exception:
+                pass
+        return super().render(name, labelnames, key)
+
+
+class _HistogramValue:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def render(self, name, labelnames, key):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            le = f'le="{bound}"'
+            lines.append(f"{name}_bucket{_format_labels(labelnames, key, le)} {cumulative}")
+        cumulative += self.counts[-1]
+        le = 'le="+Inf"'
+        lines.append(f"{name}_bucket{_format_labels(labelnames, key, le)} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labelnames, key)} {self.sum}")
+        lines.append(f"{name}_count{_format_labels(labelnames, key)} {cumulative}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterValue()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeValue()
+
+    def set(self, value: float) -> None:
+        self._default().set(value)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._default().set_function(function)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> None:
+        self.metrics.append(metric)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+JOIN_LATENCY = Histogram("despawner_member_join_seconds", "on_member_join end-to-end latency")
+KEYWORD_MATCH_LATENCY = Histogram("despawner_keyword_match_seconds", "Keyword matching time per member")
+BANLIST_LOOKUP_LATENCY = Histogram("despawner_banlist_lookup_seconds", "Banlist lookup time")
+REST_LATENCY = Histogram("despawner_rest_seconds", "Discord REST call latency", labelnames=("route",))
+RATE_LIMITED = Counter("despawner_rate_limited_total", "429 responses received", labelnames=("route",))
+BANLIST_SIZE = Gauge("despawner_banlist_entries", "IDs on the loaded banlist")
+BANLIST_VERSION = Gauge("despawner_banlist_version", "Version of the loaded banlist")
+GUILDS = Gauge("despawner_guilds", "Guilds the bot is in")
+CACHED_MEMBERS = Gauge("despawner_cached_members", "Members held in the member cache")
+JOIN_QUEUE_DEPTH = Gauge("despawner_join_queue_depth", "Member joins waiting to be screened")
+JOIN_QUEUE_OVERFLOW = Counter("despawner_join_queue_overflow_total", "Joins turned away by a full queue",
+                              labelnames=("outcome",))
+JOIN_BATCH_SIZE = Histogram("despawner_join_batch_size", "Members screened per join batch",
+                            buckets=(1, 2, 5, 10, 25, 50, 100, 250))
+DECISION_CACHE_LOOKUPS = Counter("despawner_decision_cache_lookups_total", "Screening verdict cache lookups",
+                                 labelnames=("result",))
+OUTBOX_DEPTH = Gauge("despawner_outbox_depth", "Log channel messages waiting to be sent")
+OUTBOX_MESSAGES = Counter("despawner_outbox_messages_total", "Batched log channel messages by outcome",
+                          labelnames=("outcome",))
+DM_QUEUE_DEPTH = Gauge("despawner_dm_queue_depth", "Users with a ban DM waiting to be sent")
+DM_MESSAGES = Counter("despawner_dm_messages_total", "Ban DMs by outcome", labelnames=("outcome",))
+LOOP_LAG = Gauge("despawner_event_loop_lag_seconds", "How late the event loop ran a scheduled callback")
+
+
+def route_label(route: str) -> str:
+    """Collapse a route key like ``ban:<guild_id>`` to ``ban`` to bound label cardinality"""
+    return route.split(":", 1)[0]
+
+
+class MetricsServer:
+    """Minimal HTTP server exposing REGISTRY at /metrics"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 9108, lag_interval: float = 1.0):
+        self.host = host
+        self.port = port
+        self.lag_interval = lag_interval
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._lag_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self._lag_task = asyncio.create_task(self._measure_lag())
+        print(f"Metrics available at http://{self.host}:{self.port}/metrics")
+
+    async def close(self) -> None:
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _measure_lag(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            LOOP_LAG.set(max(0.0, loop.time() - expected))
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = await asyncio.wait_for(reader.readline(), timeout=5)
+            # Drain the headers; nothing in them matters here
+            while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status, body = "200 OK", REGISTRY.render().encode()
+            else:
+                status, body = "404 Not Found", b"Not Found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,196 @@
+import asyncio
+from collections import deque
+from itertools import groupby
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Union
+
+import discord
+
+from utils.metrics import OUTBOX_DEPTH, OUTBOX_MESSAGES, REST_LATENCY
+
+# Discord's per-message limits
+MAX_CONTENT = 2000
+MAX_EMBEDS = 10
+MAX_EMBED_TOTAL = 6000
+
+Item = Union[str, discord.Embed]
+
+
+def pack_lines(lines: Iterable[str], limit: int = MAX_CONTENT) -> Iterator[str]:
+    """Pack lines into as few messages as fit Discord's length limit"""
+    message = ""
+    for line in lines:
+        line = line[:limit]
+        if message and len(message) + len(line) + 1 > limit:
+            yield message
+            message = ""
+        message = f"{message}\n{line}" if message else line
+    if message:
+        yield message
+
+
+class ChannelOutbox:
+    """Outbound message queue per log channel.
+
+    ``post`` and ``post_embed`` return immediately; a task per channel sends
+    what's queued ``flush_interval`` seconds after the first item arrives,
+    or straight away once a full message's worth is waiting. Text lines are
+    packed into messages of up to 2000 characters and embeds up to 10 per
+    message. When more than ``digest_after`` embeds are waiting (a raid, or
+    a rate limited channel), runs of embeds with the same title are folded
+    into digest embeds listing each one's description.
+
+    A slow or rate limited channel only holds up its own task, never the
+    caller. Past ``max_pending`` queued items the oldest are dropped, and
+    the channel is told how many.
+    """
+
+    def __init__(self, flush_interval: float = 2.0, digest_after: int = MAX_EMBEDS, max_pending: int = 5000):
+        self.flush_interval = flush_interval
+        self.digest_after = digest_after
+        self.max_pending = max_pending
+        self._pending: Dict[int, Deque[Item]] = {}
+        self._channels: Dict[int, Any] = {}
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._wakeups: Dict[int, asyncio.Event] = {}
+        self._dropped: Dict[int, int] = {}
+        self._closing = False
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        OUTBOX_DEPTH.set_function(lambda: sum(len(queue) for queue in self._pending.values()))
+
+    def post(self, channel, content: str) -> None:
+        """Queue a line of text for ``channel``; does nothing if the channel is None"""
+        if channel is not None:
+            self._enqueue(channel, content)
+
+    def post_embed(self, channel, embed: discord.Embed) -> None:
+        """Queue an embed for ``channel``; does nothing if the channel is None"""
+        if channel is not None:
+            self._enqueue(channel, embed)
+
+    def _enqueue(self, channel, item: Item) -> None:
+        channel_id = channel.id
+        queue = self._pending.setdefault(channel_id, deque())
+        self._channels[channel_id] = channel
+        if len(queue) >= self.max_pending:
+            queue.popleft()
+            self._dropped[channel_id] = self._dropped.get(channel_id, 0) + 1
+            self.dropped += 1
+            OUTBOX_MESSAGES.labels("dropped").inc()
+        queue.append(item)
+        task = self._tasks.get(channel_id)
+        if task is None or task.done():
+            self._wakeups[channel_id] = asyncio.Event()
+            self._tasks[channel_id] = asyncio.create_task(self._drain(channel_id))
+        elif len(queue) >= MAX_EMBEDS:
+            self._wakeups[channel_id].set()
+
+    async def _drain(self, channel_id: int) -> None:
+        """Send the channel's queue until it stays empty"""
+        queue = self._pending[channel_id]
+        wakeup = self._wakeups[channel_id]
+        try:
+            while queue:
+                if not self._closing and len(queue) < MAX_EMBEDS:
+                    try:
+                        await asyncio.wait_for(wakeup.wait(), self.flush_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                wakeup.clear()
+                items = list(queue)
+                queue.clear()
+                channel = self._channels[channel_id]
+                for message in self._pack(items, self._dropped.pop(channel_id, 0)):
+                    await self._send(channel, message)
+        finally:
+            # Nothing can be queued between the empty check and here, so no item is stranded
+            if self._tasks.get(channel_id) is asyncio.current_task():
+                del self._tasks[channel_id]
+            if not queue:
+                self._pending.pop(channel_id, None)
+                self._channels.pop(channel_id, None)
+
+    def _pack(self, items: List[Item], dropped: int = 0) -> List[Dict[str, Any]]:
+        """Turn queued items into as few ``channel.send`` keyword sets as Discord allows"""
+        lines = [item for item in items if isinstance(item, str)]
+        embeds = [item for item in items if not isinstance(item, str)]
+        if dropped:
+            lines.append(f"⚠️ {dropped} log messages were dropped while this channel was backlogged")
+        if len(embeds) > self.digest_after:
+            embeds = self._digest(embeds)
+
+        embed_groups: List[List[discord.Embed]] = []
+        total = 0
+        for embed in embeds:
+            size = len(embed)
+            if not embed_groups or len(embed_groups[-1]) >= MAX_EMBEDS or total + size > MAX_EMBED_TOTAL:
+                embed_groups.append([])
+                total = 0
+            embed_groups[-1].append(embed)
+            total += size
+
+        contents = list(pack_lines(lines))
+        messages = []
+        for i in range(max(len(contents), len(embed_groups))):
+            message: Dict[str, Any] = {}
+            if i < len(contents):
+                message["content"] = contents[i]
+            if i < len(embed_groups):
+                message["embeds"] = embed_groups[i]
+            messages.append(message)
+        return messages
+
+    @staticmethod
+    def _digest(embeds: List[discord.Embed]) -> List[discord.Embed]:
+        """Fold runs of same-titled embeds into embeds listing their descriptions"""
+        folded = []
+        for title, run in groupby(embeds, key=lambda embed: embed.title):
+            run = list(run)
+            if len(run) == 1:
+                folded.append(run[0])
+                continue
+            lines = [" · ".join((embed.description or "").splitlines()) for embed in run]
+            # Keep each digest embed well inside the 6000 character budget of a message
+            for i, description in enumerate(pack_lines(lines, MAX_EMBED_TOTAL // 2)):
+                folded.append(discord.Embed(
+                    title=f"{title} ×{len(run)}" if i == 0 else f"{title} (continued)",
+                    description=description,
+                    color=run[0].color,
+                    timestamp=run[-1].timestamp
+                ))
+        return folded
+
+    async def _send(self, channel, message: Dict[str, Any]) -> None:
+        try:
+            with REST_LATENCY.labels("log").time():
+                await channel.send(**message)
+            self.sent += 1
+            OUTBOX_MESSAGES.labels("sent").inc()
+        except discord.HTTPException as e:
+            self.failed += 1
+            OUTBOX_MESSAGES.labels("failed").inc()
+            print(f"Could not send log message to channel {channel.id}: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": sum(len(queue) for queue in self._pending.values()),
+            "channels": len(self._tasks),
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """Send everything still queued without waiting out the flush interval"""
+        self._closing = True
+        for wakeup in self._wakeups.values():
+            wakeup.set()
+        tasks = list(self._tasks.values())
+        if not tasks:
+            return
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            print(f"Outbox: gave up on {len(pending)} channels with unsent log messages")
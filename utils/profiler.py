@@ -0,0 +1,94 @@
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+# Functions called out in their own section of the report
+HOT_SPOTS = r"on_member_join|_process_joins|_find_matches|find_banned_keywords|contains_banned_keyword|match_fields|log_action|ban_with_appeal|utils\.py"
+
+
+class ProfileSession:
+    """cProfile + tracemalloc capture of the live process.
+
+    Only one session can run at a time, since cProfile can't nest.
+    """
+
+    _active: Optional["ProfileSession"] = None
+
+    def __init__(self, top: int = 40):
+        self.top = top
+        self.profile = cProfile.Profile()
+        self.started = 0.0
+        self.stopped = 0.0
+        self.joins = 0
+        self._started_tracemalloc = False
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+
+    @classmethod
+    def active(cls) -> Optional["ProfileSession"]:
+        return cls._active
+
+    def start(self) -> None:
+        if ProfileSession._active is not None:
+            raise RuntimeError("A profiling session is already running")
+        ProfileSession._active = self
+        try:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(10)
+                self._started_tracemalloc = True
+            self._baseline = tracemalloc.take_snapshot()
+            self.started = time.monotonic()
+            self.profile.enable()
+        except BaseException:
+            # Don't leave a half-started session blocking every later one
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+            ProfileSession._active = None
+            raise
+
+    def stop(self) -> str:
+        """Stop profiling and return the text report"""
+        try:
+            self.profile.disable()
+            self.stopped = time.monotonic()
+            snapshot = tracemalloc.take_snapshot()
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+        finally:
+            ProfileSession._active = None
+        return self._report(snapshot)
+
+    def _report(self, snapshot: tracemalloc.Snapshot) -> str:
+        out = io.StringIO()
+        out.write(f"Profile taken {datetime.now().isoformat(timespec='seconds')}\n")
+        out.write(f"Duration: {self.stopped - self.started:.1f}s, member joins seen: {self.joins}\n\n")
+
+        stats = pstats.Stats(self.profile, stream=out)
+        stats.strip_dirs()
+        out.write("=== Hot spots (cumulative) ===\n")
+        stats.sort_stats("cumulative").print_stats(HOT_SPOTS)
+        out.write("\n=== Top functions by cumulative time ===\n")
+        stats.sort_stats("cumulative").print_stats(self.top)
+        out.write("\n=== Top functions by own time ===\n")
+        stats.sort_stats("tottime").print_stats(self.top)
+
+        out.write("\n=== Allocations since start (tracemalloc) ===\n")
+        if self._baseline is not None:
+            for stat in snapshot.compare_to(self._baseline, "lineno")[:25]:
+                out.write(f"{stat}\n")
+        out.write("\n=== Largest live allocations ===\n")
+        for stat in snapshot.statistics("lineno")[:25]:
+            out.write(f"{stat}\n")
+        return out.getvalue()
+
+    def save(self, report: str, directory: Optional[Path] = None) -> Path:
+        """Write a report to profiles/ and return its path"""
+        directory = directory or Path(__file__).parent.parent / "profiles"
+        directory.mkdir(exist_ok=True)
+        path = directory / f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}.txt"
+        path.write_text(report)
+        return path
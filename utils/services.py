@@ -0,0 +1,125 @@
+import asyncio
+import os
+from pathlib import Path
+from typing import Optional
+from utils.action_logger import ActionLogger
+from utils.ban_executor import BanExecutor
+from utils.banlist import BanlistIndex
+from utils.config import ConfigManager
+from utils.counters import BanCounters
+from utils.decision_cache import DecisionCache
+from utils.dm_queue import DMQueue
+from utils.join_queue import JoinQueue
+from utils.ledger import BanLedger
+from utils.metrics import MetricsServer
+from utils.outbox import ChannelOutbox
+from utils.settings import SettingsStore, get_settings
+from utils.sharding import shard_label
+
+
+class Services:
+    """Process-wide state shared by every cog, reachable as ``bot.services``.
+
+    Each service is created exactly once, so every cog sees the same guild
+    configs, banlist snapshot, counters and log handles. Cogs should take
+    what they need from here instead of constructing their own.
+    """
+
+    def __init__(self, settings: SettingsStore, config: ConfigManager, banlist: BanlistIndex,
+                 executor: BanExecutor, join_queue: JoinQueue, decisions: DecisionCache,
+                 logger: ActionLogger, ledger: BanLedger, counters: BanCounters,
+                 outbox: ChannelOutbox, dm_queue: DMQueue, metrics_server: Optional[MetricsServer] = None):
+        # Channels, appeal links and guild configs, held in memory and written behind
+        self.settings = settings
+        # Per-guild ban behaviour, stored in the settings' guild_configs section
+        self.config = config
+        # See BanlistIndex for the reload semantics
+        self.banlist = banlist
+        # Every ban goes through here so firstrun and joins share rate limit budgets
+        self.executor = executor
+        # Joins are screened in batches off the gateway dispatch; see JoinQueue for the overflow policies
+        self.join_queue = join_queue
+        # Verdicts per user, so a raid hitting many guilds is only screened once
+        self.decisions = decisions
+        self.logger = logger
+        self.ledger = ledger
+        self.counters = counters
+        # Log channel messages, batched per channel and sent off the ban path
+        self.outbox = outbox
+        # Ban DMs, sent in the background so a ban never waits on one
+        self.dm_queue = dm_queue
+        self.metrics_server = metrics_server
+
+    @classmethod
+    def from_env(cls) -> "Services":
+        """Build every service, taking tunables from the environment"""
+        settings = get_settings()
+        # Optional Prometheus endpoint, e.g. METRICS_PORT=9108
+        metrics_port = os.getenv('METRICS_PORT')
+        outbox = ChannelOutbox(
+            flush_interval=float(os.getenv('LOG_FLUSH_INTERVAL', '2.0')),
+            digest_after=int(os.getenv('LOG_DIGEST_AFTER', '10'))
+        )
+        return cls(
+            settings=settings,
+            config=ConfigManager(settings),
+            # Versioned list deltas are picked up from BANLIST_DELTA_DIR (banlist.d/ by default)
+            banlist=BanlistIndex(
+                "thelist.csv",
+                delta_dir=os.getenv('BANLIST_DELTA_DIR') or None,
+                compact_after=int(os.getenv('BANLIST_COMPACT_AFTER', '10000'))
+            ),
+            executor=BanExecutor(concurrency=int(os.getenv('BAN_CONCURRENCY', '5'))),
+            join_queue=JoinQueue(
+                maxsize=int(os.getenv('JOIN_QUEUE_SIZE', '5000')),
+                workers=int(os.getenv('JOIN_WORKERS', '2')),
+                batch_size=int(os.getenv('JOIN_BATCH_SIZE', '50')),
+                policy=os.getenv('JOIN_QUEUE_POLICY', 'spill'),
+                # Spilled joins can only be replayed by the process running their guild's shard
+                spill_path=Path(__file__).parent.parent / f"join_spill{shard_label()}.jsonl"
+            ),
+            decisions=DecisionCache(
+                maxsize=int(os.getenv('DECISION_CACHE_SIZE', '100000')),
+                ttl=float(os.getenv('DECISION_CACHE_TTL', '3600'))
+            ),
+            logger=ActionLogger(outbox=outbox),
+            ledger=BanLedger(),
+            counters=BanCounters(),
+            outbox=outbox,
+            dm_queue=DMQueue(
+                maxsize=int(os.getenv('DM_QUEUE_SIZE', '10000')),
+                concurrency=int(os.getenv('DM_CONCURRENCY', '2')),
+                max_attempts=int(os.getenv('DM_MAX_ATTEMPTS', '4'))
+            ),
+            metrics_server=MetricsServer(
+                host=os.getenv('METRICS_HOST', '127.0.0.1'), port=int(metrics_port)
+            ) if metrics_port else None,
+        )
+
+    async def start(self) -> None:
+        """Start the background tasks; call from setup_hook"""
+        self.banlist.start_watching()
+        self.counters.start_flushing()
+        self.dm_queue.start()
+        if self.metrics_server:
+            await self.metrics_server.start()
+
+    async def close(self) -> None:
+        """Stop everything in dependency order, flushing what's pending"""
+        self.banlist.stop_watching()
+        # Finish screening queued joins while the ledger and counters are still open
+        await self.join_queue.stop()
+        # Send the log messages and DMs those last bans queued
+        await self.outbox.close()
+        await self.dm_queue.stop()
+        await self.settings.flush()
+        await self.counters.close()
+        if self.metrics_server:
+            await self.metrics_server.close()
+        self.logger.close()
+        await asyncio.to_thread(self.ledger.close)
+
+    def flush_sync(self) -> None:
+        """Last-chance flush after the event loop has gone"""
+        self.settings.flush_sync()
+        self.counters.flush_sync()
@@ -0,0 +1,205 @@
+import asyncio
+import copy
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Set
+from utils.filelock import file_lock
+
+
+class SettingsStore:
+    """In-memory store for the bot's per-guild JSON settings files.
+
+    Everything is read once at startup; after that reads are plain dict
+    lookups. Writes mark a section dirty and schedule a single flush
+    ``flush_delay`` seconds later, so a burst of changes becomes one write.
+    Files are replaced atomically (temp file + rename) so a crash can never
+    leave a half-written file behind.
+
+    Several shard processes can share the same files. Changes are tracked
+    per guild key, and a flush re-reads the file under a lock and only
+    writes over the keys this process changed, so processes don't clobber
+    each other's guilds. Keys written by other processes are picked up at
+    each flush.
+    """
+
+    FILES = {
+        "channels": ("channels.json", None),
+        "appeal_links": ("appeal_links.json", None),
+        "guild_configs": ("guild_configs.json", 2),
+        "screened_versions": ("screened_versions.json", None),
+    }
+
+    def __init__(self, root_dir: Optional[Path] = None, flush_delay: float = 2.0):
+        self.root_dir = Path(root_dir or Path(__file__).parent.parent)
+        self.flush_delay = flush_delay
+        self.sections: Dict[str, Dict[str, Any]] = {}
+        # section -> keys changed since the last flush, or None if the whole section was replaced
+        self._dirty: Dict[str, Optional[Set[str]]] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_lock = asyncio.Lock()
+        for section in self.FILES:
+            self.sections[section] = self._read(section)
+
+    def _path(self, section: str) -> Path:
+        return self.root_dir / self.FILES[section][0]
+
+    def _read(self, section: str) -> Dict[str, Any]:
+        path = self._path(section)
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Error loading {path}: {e}. Starting with empty settings.")
+            return {}
+
+    async def reload(self) -> None:
+        """Flush pending writes, then re-read every file from disk"""
+        await self.flush()
+        for section in self.FILES:
+            data = await asyncio.to_thread(self._read, section)
+            live = self.sections[section]
+            live.clear()
+            live.update(data)
+
+    def section(self, section: str) -> Dict[str, Any]:
+        """The live dict for a section. Call mark_dirty after mutating it."""
+        return self.sections[section]
+
+    def get_channel(self, guild_id) -> Optional[int]:
+        return self.sections["channels"].get(str(guild_id))
+
+    def set_channel(self, guild_id, channel_id: int) -> None:
+        self.sections["channels"][str(guild_id)] = channel_id
+        self.mark_dirty("channels", guild_id)
+
+    def get_appeal_link(self, guild_id) -> str:
+        return self.sections["appeal_links"].get(str(guild_id), "")
+
+    def set_appeal_link(self, guild_id, link: str) -> None:
+        self.sections["appeal_links"][str(guild_id)] = link
+        self.mark_dirty("appeal_links", guild_id)
+
+    def get_screened_version(self, guild_id) -> Optional[Dict[str, Any]]:
+        """``{"version", "at"}`` of the guild's last complete firstrun, if any"""
+        return self.sections["screened_versions"].get(str(guild_id))
+
+    def set_screened_version(self, guild_id, version: int) -> None:
+        self.sections["screened_versions"][str(guild_id)] = {"version": version, "at": int(time.time())}
+        self.mark_dirty("screened_versions", guild_id)
+
+    def replace(self, section: str, data: Dict[str, Any]) -> None:
+        """Swap a whole section's contents, keeping the same dict object"""
+        live = self.sections[section]
+        if data is not live:
+            live.clear()
+            live.update(data)
+        self.mark_dirty(section)
+
+    def mark_dirty(self, section: str, key=None) -> None:
+        """Schedule a changed key, or the whole section if no key is given, to be written out"""
+        if key is None:
+            self._dirty[section] = None
+        elif section not in self._dirty:
+            self._dirty[section] = {str(key)}
+        elif self._dirty[section] is not None:
+            self._dirty[section].add(str(key))
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop yet (startup or scripts): write straight away
+            self.flush_sync()
+            return
+        if self._flush_handle is None:
+            self._flush_handle = loop.call_later(
+                self.flush_delay, lambda: asyncio.ensure_future(self.flush())
+            )
+
+    def _serialize(self):
+        """Snapshot the dirty keys' values on the calling (loop) thread"""
+        dirty, self._dirty = self._dirty, {}
+        changes = []
+        for section, keys in dirty.items():
+            live = self.sections[section]
+            if keys is None:
+                changes.append((section, None, copy.deepcopy(live)))
+            else:
+                changes.append((section, keys, {k: copy.deepcopy(live[k]) for k in keys if k in live}))
+        return changes
+
+    @staticmethod
+    def _write_atomic(path: Path, payload: str) -> None:
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, 'w') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _write_all(self, changes) -> Dict[str, Dict[str, Any]]:
+        """Merge each section's changes into its file under the file lock (blocking).
+
+        Returns the merged contents of every section written.
+        """
+        merged = {}
+        for section, keys, values in changes:
+            path = self._path(section)
+            try:
+                with file_lock(path):
+                    if keys is None:
+                        data = values
+                    else:
+                        data = self._read(section)
+                        for key in keys:
+                            if key in values:
+                                data[key] = values[key]
+                            else:
+                                data.pop(key, None)
+                    self._write_atomic(path, json.dumps(data, indent=self.FILES[section][1]))
+                merged[section] = data
+            except OSError as e:
+                print(f"Error saving {path}: {e}")
+        return merged
+
+    def _adopt(self, merged: Dict[str, Dict[str, Any]]) -> None:
+        """Take in keys other processes wrote, except ones changed here since the flush"""
+        for section, data in merged.items():
+            if section in self._dirty and self._dirty[section] is None:
+                continue
+            pending = self._dirty.get(section) or set()
+            live = self.sections[section]
+            for key, value in data.items():
+                if key not in pending and live.get(key) != value:
+                    live[key] = value
+
+    async def flush(self) -> None:
+        """Write every dirty section in a worker thread"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        async with self._flush_lock:
+            changes = self._serialize()
+            if changes:
+                self._adopt(await asyncio.to_thread(self._write_all, changes))
+
+    def flush_sync(self) -> None:
+        """Write every dirty section right now. Used at shutdown."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._adopt(self._write_all(self._serialize()))
+
+
+_store: Optional[SettingsStore] = None
+
+
+def get_settings() -> SettingsStore:
+    """The process-wide settings store"""
+    global _store
+    if _store is None:
+        _store = SettingsStore()
+    return _store
@@ -0,0 +1,50 @@
+import os
+from typing import Any, Dict, List, Optional
+
+
+def shard_ids() -> Optional[List[int]]:
+    """The shards this process runs, from SHARD_IDS (e.g. ``0,1,2``)"""
+    raw = os.getenv('SHARD_IDS', '')
+    ids = sorted({int(i) for i in raw.split(',') if i.strip()})
+    return ids or None
+
+
+def shard_options() -> Dict[str, Any]:
+    """AutoShardedBot keyword arguments from SHARD_COUNT and SHARD_IDS.
+
+    With neither set, discord.py uses the shard count Discord recommends and
+    runs every shard in this process. start.sh sets both to split the shards
+    between several processes.
+    """
+    count = os.getenv('SHARD_COUNT')
+    ids = shard_ids()
+    if ids is not None:
+        if not count:
+            raise ValueError("SHARD_IDS needs SHARD_COUNT to be set as well")
+        if ids[-1] >= int(count):
+            raise ValueError(f"SHARD_IDS {ids} out of range for SHARD_COUNT={count}")
+    options: Dict[str, Any] = {}
+    if count:
+        options["shard_count"] = int(count)
+    if ids is not None:
+        options["shard_ids"] = ids
+    return options
+
+
+def owns_global_commands() -> bool:
+    """Whether this process syncs the global command tree.
+
+    Only one process should, so it's the one running shard 0.
+    """
+    ids = shard_ids()
+    return ids is None or 0 in ids
+
+
+def shard_label() -> str:
+    """Suffix for per-process files: ``""`` unsharded, else e.g. ``-0-3``"""
+    ids = shard_ids()
+    if ids is None:
+        return ""
+    if ids == list(range(ids[0], ids[-1] + 1)):
+        return f"-{ids[0]}-{ids[-1]}"
+    return "-" + "_".join(map(str, ids))
@@ -0,0 +1,109 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from utils.filelock import file_lock
+
+
+def command_payload(tree, guild=None) -> List[dict]:
+    """The JSON Discord would receive for the tree's commands"""
+    payload = []
+    for command in tree.get_commands(guild=guild):
+        try:
+            payload.append(command.to_dict(tree))
+        except TypeError:
+            payload.append(command.to_dict())  # discord.py < 2.4
+    return payload
+
+
+def command_fingerprint(tree, guild=None) -> str:
+    payload = sorted(command_payload(tree, guild), key=lambda c: (c.get("type", 1), c["name"]))
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class CommandSyncState:
+    """Fingerprints of the command trees last synced to Discord.
+
+    Stored in ``command_sync.json`` per application, so a restart or a
+    gateway reconnect only syncs when the commands actually changed.
+    Shard processes share the file; each one only writes the guilds it
+    synced, and the global fingerprint only if it synced the global tree.
+    """
+
+    def __init__(self, application_id, path: Optional[Path] = None):
+        self.application_id = str(application_id)
+        self.path = Path(path or Path(__file__).parent.parent / "command_sync.json")
+        self.global_fingerprint: Optional[str] = None
+        self.guilds: Dict[str, str] = {}
+        self._load()
+        self._loaded_global = self.global_fingerprint
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f).get(self.application_id, {})
+            self.global_fingerprint = data.get("global")
+            self.guilds = dict(data.get("guilds", {}))
+        except FileNotFoundError:
+            pass
+        except (json.JSONDecodeError, AttributeError, OSError) as e:
+            print(f"Ignoring {self.path}: {e}")
+
+    def save(self) -> None:
+        """Merge our fingerprints into the shared file (blocking; waits for other shards' writes)"""
+        self._write(dict(self.guilds), self.global_fingerprint)
+
+    async def save_async(self) -> None:
+        """save() in a worker thread, so the event loop never waits on the file lock"""
+        await asyncio.to_thread(self._write, dict(self.guilds), self.global_fingerprint)
+
+    def _write(self, our_guilds: Dict[str, str], our_global: Optional[str]) -> None:
+        with file_lock(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                data = {}
+            entry = data.get(self.application_id) or {}
+            guilds = dict(entry.get("guilds", {}))
+            guilds.update(our_guilds)
+            global_fingerprint = entry.get("global")
+            if our_global != self._loaded_global:
+                global_fingerprint = our_global
+            data[self.application_id] = {"global": global_fingerprint, "guilds": guilds}
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def guild_synced(self, guild_id, fingerprint: str) -> bool:
+        return self.guilds.get(str(guild_id)) == fingerprint
+
+
+class StartupTimer:
+    """Wall-clock time of each startup phase, reported once the bot is ready"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.reported = False
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - started
+
+    def mark(self, name: str, since: float) -> None:
+        self.phases[name] = time.perf_counter() - since
+
+    def report(self) -> str:
+        total = time.perf_counter() - self.started
+        parts = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.phases.items())
+        return f"Startup took {total:.2f}s ({parts})"
@@ -4,12 +4,18 @@ import csv
 import discord
 from discord.ext import commands
 import json
+from typing import Dict, List, Optional
+from utils.keywords import KeywordHit, KeywordMatcher
+from utils.settings import get_settings
+from utils.metrics import KEYWORD_MATCH_LATENCY
 
 class Utils:
-    CHANNEL_FILE = "channels.json"
-    APPEAL_FILE = "appeal_links.json"
     BAN_COUNT_FILE = "ban_count.txt"  # Add this constant
     BANNED_KEYWORDS = ["spawnist", "spawn", "spawnism", "proship", "prosaken", "darkship"]
+    # Bumped by set_banned_keywords; the compiled matcher and cached verdicts are keyed on it
+    keywords_version = 0
+    _matcher: Optional[KeywordMatcher] = None
+    _matcher_version = -1
     
     def __init__(self):
         pass
@@ -30,34 +36,20 @@ class Utils:
         return data
 
     def load_channels(self):
-        if os.path.exists(self.CHANNEL_FILE): 
-            with open(self.CHANNEL_FILE, "r") as f:
-                return json.load(f)
-        return {}
+        """Guild ID -> log channel ID, served from the shared settings store"""
+        return get_settings().section("channels")
+
     def save_channels(self,channels)->None:
-        with open(self.CHANNEL_FILE, "w") as f:
-            json.dump(channels, f)
+        get_settings().replace("channels", channels)
 
 
     def load_appeal_link(self, guild_id: str) -> str:
         """Load appeal link for specific guild"""
-        if os.path.exists(self.APPEAL_FILE):
-            with open(self.APPEAL_FILE, "r") as f:
-                appeals = json.load(f)
-                return appeals.get(str(guild_id), "")
-        return ""
+        return get_settings().get_appeal_link(guild_id)
 
     def save_appeal_link(self, guild_id: str, link: str) -> None:
         """Save appeal link for specific guild"""
-        appeals = {}
-        if os.path.exists(self.APPEAL_FILE):
-            with open(self.APPEAL_FILE, "r") as f:
-                appeals = json.load(f)
-        
-        appeals[str(guild_id)] = link
-        
-        with open(self.APPEAL_FILE, "w") as f:
-            json.dump(appeals, f)
+        get_settings().set_appeal_link(guild_id, link)
 
     def load_ban_count(self) -> int:
         """Load the total number of bans"""
@@ -66,36 +58,26 @@ class Utils:
                 return int(f.read().strip() or "0")
         return 0
 
-    def increment_ban_count(self) -> int:
-        """Increment and save the ban count"""
-        count = self.load_ban_count() + 1
-        with open(self.BAN_COUNT_FILE, "w") as f:
-            f.write(str(count))
-        return count
-             
+    @classmethod
+    def set_banned_keywords(cls, keywords: List[str]) -> None:
+        """Replace the keyword list; the matcher is rebuilt on next use"""
+        cls.BANNED_KEYWORDS = list(keywords)
+        cls.keywords_version += 1
+
+    @classmethod
+    def keyword_matcher(cls) -> KeywordMatcher:
+        """The compiled matcher for BANNED_KEYWORDS, built once per keywords_version"""
+        if cls._matcher_version != cls.keywords_version:
+            cls._matcher = KeywordMatcher(cls.BANNED_KEYWORDS)
+            cls._matcher_version = cls.keywords_version
+        return cls._matcher
+
     def contains_banned_keyword(self,text):
         if not text:
             return None
-        text_lower = str(text).lower()
-        for keyword in self.BANNED_KEYWORDS:
-            if keyword.lower() in text_lower:
-                return keyword
-        return None  
-    
-    async def ban_with_appeal(self, member: discord.Member, reason: str, keyword: str = None):
-        try:
-            await member.ban(reason=reason)
-            dm_message = "You have been banned due to your alleged connection with Spawnism or forbidden content."
-            if keyword:
-                dm_message += f"\nBan triggered by keyword: **{keyword}**."
-            if self.appeal_link:
-                dm_message += f"\nIf you believe this is a mistake, you may appeal here: {self.appeal_link}"
-            try:
-                await member.send(dm_message)
-            except discord.HTTPException:
-                pass  # Failed to DM user
-        except discord.Forbidden:
-            pass  # Bot lacks permissions
-        except discord.HTTPException:
-            pass  # API error
+        return self.keyword_matcher().first_match(str(text))
 
+    def find_banned_keywords(self, fields: Dict[str, Optional[str]]) -> List[KeywordHit]:
+        """Find every banned keyword across several fields in one pass"""
+        with KEYWORD_MATCH_LATENCY.time():
+            return self.keyword_matcher().match_fields(fields)